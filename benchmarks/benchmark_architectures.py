@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark arsitektur CNN: latih dan evaluasi tiap arsitektur/ukuran input pada data yang sama
+(split validasi sama dengan train_model), lalu laporkan jumlah parameter, MACs, latency CPU
+(1 wajah dan per wajah dalam batch, runtime TFLite) dan akurasi validasi.
+Rekomendasi: model tercepat yang akurasinya memenuhi --accuracy-bar.
+
+Contoh:
+    python benchmarks/benchmark_architectures.py --epochs 15
+    python benchmarks/benchmark_architectures.py --architectures baseline mobilenet_small --img-sizes 160 96 --json report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.create_cnn_model import ARCHITECTURES, create_cnn_model, make_dataset
+from src.inference_backend import KerasBackend, TFLiteBackend
+from src.model_export import _measure_latency
+
+def count_macs(model):
+    """Multiply-accumulates of one forward pass (conv, depthwise conv and dense layers)"""
+    macs = 0
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.DepthwiseConv2D):
+            _, out_h, out_w, out_c = layer.output.shape
+            kernel_h, kernel_w = layer.kernel_size
+            macs += out_h * out_w * out_c * kernel_h * kernel_w
+        elif isinstance(layer, tf.keras.layers.Conv2D):
+            _, out_h, out_w, out_c = layer.output.shape
+            kernel_h, kernel_w = layer.kernel_size
+            in_c = layer.input.shape[-1]
+            macs += out_h * out_w * out_c * kernel_h * kernel_w * in_c
+        elif isinstance(layer, tf.keras.layers.Dense):
+            macs += layer.input.shape[-1] * layer.units
+    return int(macs)
+
+def latency_backend(model, path):
+    """TFLite backend of the model (deployment runtime), Keras if the conversion fails"""
+    try:
+        with open(path, 'wb') as f:
+            f.write(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+        return TFLiteBackend(path), 'tflite'
+    except Exception as e:
+        print(f"TFLite conversion failed ({e}), timing Keras instead")
+        return KerasBackend(model=model), 'keras'
+
+def benchmark(architecture, img_size, X, y, train_idx, val_idx, num_classes, args, workdir):
+    train_ds = make_dataset(X, y, train_idx, batch_size=args.batch_size, shuffle=True, img_size=img_size)
+    val_ds = make_dataset(X, y, val_idx, batch_size=args.batch_size, img_size=img_size)
+
+    tf.keras.utils.set_random_seed(42)
+    model = create_cnn_model((img_size[1], img_size[0], 3), num_classes, architecture)
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=args.learning_rate),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+
+    started = time.perf_counter()
+    history = model.fit(train_ds, validation_data=val_ds, epochs=args.epochs, verbose=args.verbose, callbacks=[
+        tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=args.patience, restore_best_weights=True)])
+    train_seconds = time.perf_counter() - started
+    _, val_accuracy = model.evaluate(val_ds, verbose=0)
+
+    # Latency pada crop validasi asli (uint8), ukuran sesuai model
+    sample = next(iter(val_ds.unbatch().batch(args.latency_batch).take(1)))[0].numpy()
+    backend, runtime = latency_backend(model, os.path.join(workdir, f"{architecture}_{img_size[0]}.tflite"))
+    single_ms = _measure_latency(backend, sample[:1], args.repeats)
+    batch_ms = _measure_latency(backend, sample, args.repeats) / len(sample)
+
+    return {
+        'architecture': architecture,
+        'img_size': list(img_size),
+        'params': int(model.count_params()),
+        'macs': count_macs(model),
+        'runtime': runtime,
+        'single_latency_ms': single_ms,
+        'batch_latency_ms_per_face': batch_ms,
+        'val_accuracy': float(val_accuracy),
+        'epochs': len(history.epoch),
+        'train_seconds': train_seconds,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CNN architecture latency/accuracy benchmark")
+    parser.add_argument('--architectures', nargs='+', default=list(ARCHITECTURES), choices=list(ARCHITECTURES))
+    parser.add_argument('--img-sizes', nargs='+', type=int, default=[160, 112, 96])
+    parser.add_argument('--epochs', type=int, default=15)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--learning-rate', type=float, default=0.001)
+    parser.add_argument('--latency-batch', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--accuracy-bar', type=float, default=0.95, help="Minimum validation accuracy to recommend")
+    parser.add_argument('--data-dir', default='data/training_data')
+    parser.add_argument('--verbose', type=int, default=0)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    X = np.load(os.path.join(args.data_dir, 'X_train.npy'), mmap_mode='r')
+    y = np.load(os.path.join(args.data_dir, 'y_train.npy'))
+    # Split yang sama dengan train_model
+    train_idx, val_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    num_classes = int(y.max()) + 1
+    print(f"{len(y)} samples, {num_classes} classes, cached at {X.shape[2]}x{X.shape[1]}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for img_size in args.img_sizes:
+            for architecture in args.architectures:
+                print(f"Training {architecture} @ {img_size}x{img_size} ...")
+                results.append(benchmark(architecture, (img_size, img_size), X, y, train_idx, val_idx,
+                                         num_classes, args, workdir))
+
+    print(f"\n{'architecture':<17}{'input':>8}{'params':>11}{'MMACs':>9}{'1 face':>10}"
+          f"{'per face@' + str(args.latency_batch):>14}{'val acc':>9}{'epochs':>8}")
+    for result in results:
+        print(f"{result['architecture']:<17}{result['img_size'][0]:>5}px{result['params']:>11,}"
+              f"{result['macs'] / 1e6:>9.1f}{result['single_latency_ms']:>8.2f}ms"
+              f"{result['batch_latency_ms_per_face']:>12.2f}ms{result['val_accuracy']:>9.3f}{result['epochs']:>8}")
+
+    passing = [result for result in results if result['val_accuracy'] >= args.accuracy_bar]
+    recommended = min(passing, key=lambda result: result['single_latency_ms']) if passing else None
+    if recommended:
+        print(f"\nFastest model with val accuracy >= {args.accuracy_bar}: {recommended['architecture']} "
+              f"@ {recommended['img_size'][0]}px -> set MODEL_ARCHITECTURE = '{recommended['architecture']}' "
+              f"and IMG_SIZE = {tuple(recommended['img_size'])} in config/model.py")
+    else:
+        print(f"\nNo model reached val accuracy {args.accuracy_bar}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'accuracy_bar': args.accuracy_bar, 'results': results,
+                       'recommended': recommended}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark lookup attendance sebelum dan sesudah migrasi index
+Seed tabel attendance dengan skema lama (tanpa index), ukur query hot path,
+jalankan migrate_database(), lalu ukur ulang.
+
+Contoh:
+    python benchmarks/benchmark_attendance_indexes.py --rows 1000000
+    python benchmarks/benchmark_attendance_indexes.py --url mysql+mysqlconnector://root:@localhost/SAS_fr_bench --i-know-this-drops-data
+
+PERINGATAN: tabel attendance di database --url di-drop dan dibuat ulang. Selain SQLite,
+hanya jalan dengan --i-know-this-drops-data dan tidak pernah pada DATABASE_URL dari config.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, func, select
+from config.database import DATABASE_URL
+from src import models
+from src.models import Attendance
+
+def legacy_attendance_table(metadata):
+    """Attendance table as created before the indexes were added"""
+    return Table(
+        'attendance', metadata,
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('student_name', String(100), nullable=False),
+        Column('date', Date, nullable=False),
+        Column('time', String(10), nullable=False),
+        Column('status', String(20)),
+        Column('created_at', DateTime),
+    )
+
+def seed(engine, num_rows, num_students, chunk_size=50000):
+    metadata = MetaData()
+    table = legacy_attendance_table(metadata)
+    metadata.drop_all(bind=engine)
+    metadata.create_all(bind=engine)
+
+    students = [f"student_{i:05d}" for i in range(num_students)]
+    start_date = date.today() - timedelta(days=num_rows // num_students + 1)
+    created_at = datetime.now()
+
+    print(f"Seeding {num_rows} rows ({num_students} students)...")
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rows = []
+        for i in range(num_rows):
+            day, student = divmod(i, num_students)
+            rows.append({
+                'student_name': students[student],
+                'date': start_date + timedelta(days=day),
+                'time': '07:00:00',
+                'status': 'Present',
+                'created_at': created_at,
+            })
+            if len(rows) >= chunk_size:
+                conn.execute(table.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(table.insert(), rows)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    return students, start_date, start_date + timedelta(days=(num_rows - 1) // num_students)
+
+def measure(engine, students, first_date, last_date, num_queries, seed_value=42):
+    """Run the hot queries and return latency stats per query type (ms)"""
+    rng = random.Random(seed_value)
+    span = (last_date - first_date).days
+
+    queries = {
+        # record_attendance: cek (student_name, date)
+        'student_date_lookup': lambda: select(Attendance.id).where(
+            Attendance.student_name == rng.choice(students),
+            Attendance.date == first_date + timedelta(days=rng.randint(0, span))).limit(1),
+        # get_today_attendance / get_attendance_by_date
+        'date_lookup': lambda: select(Attendance.student_name).where(
+            Attendance.date == first_date + timedelta(days=rng.randint(0, span))),
+        # export_to_excel dengan rentang tanggal
+        'date_range_count': lambda: select(func.count()).select_from(Attendance.__table__).where(
+            Attendance.date.between(first_date + timedelta(days=rng.randint(0, span // 2)),
+                                    first_date + timedelta(days=rng.randint(span // 2, span)))),
+    }
+
+    results = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            latencies = []
+            for _ in range(num_queries):
+                stmt = build()
+                started = time.perf_counter()
+                conn.execute(stmt).fetchall()
+                latencies.append((time.perf_counter() - started) * 1000.0)
+            latencies.sort()
+            results[name] = {
+                'p50_ms': latencies[len(latencies) // 2],
+                'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Attendance index benchmark")
+    parser.add_argument('--url', default='sqlite:///data/benchmark_attendance.db',
+                        help="Database URL (default: local SQLite file)")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--i-know-this-drops-data', dest='drops_data', action='store_true',
+                        help="Allow a non-SQLite URL (its attendance table is dropped and re-seeded)")
+    args = parser.parse_args()
+
+    # Benchmark men-drop tabel attendance: database produksi tidak pernah boleh dipakai
+    if args.url == DATABASE_URL:
+        print("Refusing to run against DATABASE_URL from config/database.py (the attendance table would be dropped)")
+        return
+    if not args.url.startswith('sqlite') and not args.drops_data:
+        print(f"Refusing to drop the attendance table on {args.url}. Use a throwaway database and pass "
+              "--i-know-this-drops-data.")
+        return
+
+    engine = models.configure_database(args.url)
+    students, first_date, last_date = seed(engine, args.rows, args.students)
+
+    print("Measuring without indexes...")
+    before = measure(engine, students, first_date, last_date, args.queries)
+
+    started = time.perf_counter()
+    if not models.migrate_database():
+        return
+    print(f"Migration took {time.perf_counter() - started:.1f}s")
+
+    print("Measuring with indexes...")
+    after = measure(engine, students, first_date, last_date, args.queries)
+
+    print(f"\n{'query':<22}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}{'speedup':>10}")
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = b['p50_ms'] / max(a['p50_ms'], 1e-6)
+        print(f"{name:<22}{b['p50_ms']:>10.2f}ms{a['p50_ms']:>10.2f}ms"
+              f"{b['p95_ms']:>10.2f}ms{a['p95_ms']:>10.2f}ms{speedup:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark detektor wajah di frame rekaman
+Putar ulang frame dari file video atau folder gambar lewat beberapa konfigurasi detektor,
+ukur frames/sec, detections/sec dan recall (IoU >= 0.5) terhadap referensi.
+
+Referensi: file anotasi JSON {"<index frame>": [[x, y, w, h], ...]} jika ada,
+jika tidak memakai Haar full-resolution (perilaku lama detect_faces).
+
+Contoh:
+    python benchmarks/benchmark_detectors.py --video data/recordings/kelas.mp4
+    python benchmarks/benchmark_detectors.py --frames data/recordings/frames --annotations boxes.json --json report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import YUNET_MODEL_PATH, SSD_PROTOTXT_PATH, SSD_MODEL_PATH
+from src.face_detector import HaarFaceDetector, YuNetFaceDetector, SsdFaceDetector
+from src.face_tracker import iou_matrix
+from src.preprocessing_data import IMAGE_EXTENSIONS
+
+def load_frames(video=None, frames_dir=None, max_frames=300):
+    """Read recorded frames into memory so decoding is not part of the timing"""
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    else:
+        for img_file in sorted(os.listdir(frames_dir)):
+            if img_file.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(frames_dir, img_file))
+                if frame is not None:
+                    frames.append(frame)
+            if len(frames) >= max_frames:
+                break
+    return frames
+
+def detector_configs():
+    """Detector configurations to compare; DNN detectors only if their model files exist"""
+    configs = {
+        'haar_full': lambda: HaarFaceDetector(scale=1.0, use_roi=False, min_face_size=0),
+        'haar_0.5': lambda: HaarFaceDetector(scale=0.5, use_roi=False),
+        'haar_0.5_roi': lambda: HaarFaceDetector(scale=0.5, use_roi=True),
+        'haar_0.5_roi_motion': lambda: HaarFaceDetector(scale=0.5, use_roi=True, use_motion=True),
+    }
+    if os.path.exists(YUNET_MODEL_PATH):
+        configs['yunet_0.5'] = lambda: YuNetFaceDetector(scale=0.5, use_roi=False)
+        configs['yunet_0.5_roi'] = lambda: YuNetFaceDetector(scale=0.5, use_roi=True)
+    if os.path.exists(SSD_PROTOTXT_PATH) and os.path.exists(SSD_MODEL_PATH):
+        configs['ssd_1.0'] = lambda: SsdFaceDetector(scale=1.0, use_roi=False)
+    return configs
+
+def run_detector(detector, frames):
+    detections = []
+    started = time.perf_counter()
+    for frame in frames:
+        detections.append(detector.detect(frame))
+    return detections, time.perf_counter() - started
+
+def recall(detections, reference, iou_threshold=0.5):
+    """Fraction of reference boxes matched by a detection"""
+    matched = total = 0
+    for boxes, expected in zip(detections, reference):
+        expected = np.asarray(expected).reshape(-1, 4)
+        total += len(expected)
+        if len(expected) and len(boxes):
+            matched += int(np.sum(iou_matrix(expected, boxes).max(axis=1) >= iou_threshold))
+    return matched / total if total else float('nan')
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detector benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--video', help="Recorded video file")
+    source.add_argument('--frames', help="Folder with recorded frames (sorted by name)")
+    parser.add_argument('--annotations', help="JSON with ground-truth boxes per frame index")
+    parser.add_argument('--max-frames', type=int, default=300)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames, args.max_frames)
+    if not frames:
+        print("Error: Tidak ada frame yang bisa dibaca!")
+        return
+    height, width = frames[0].shape[:2]
+    print(f"Loaded {len(frames)} frames ({width}x{height})")
+
+    configs = detector_configs()
+    if args.annotations:
+        with open(args.annotations) as f:
+            annotations = json.load(f)
+        reference = [annotations.get(str(i), []) for i in range(len(frames))]
+        reference_name = args.annotations
+    else:
+        reference, _ = run_detector(configs['haar_full'](), frames)
+        reference_name = 'haar_full'
+
+    results = {}
+    for name, build in configs.items():
+        detections, elapsed = run_detector(build(), frames)
+        count = sum(len(boxes) for boxes in detections)
+        results[name] = {
+            'fps': len(frames) / elapsed,
+            'detections_per_sec': count / elapsed,
+            'ms_per_frame': elapsed / len(frames) * 1000.0,
+            'detections': count,
+            'recall': recall(detections, reference),
+        }
+
+    print(f"\nRecall reference: {reference_name}")
+    print(f"{'detector':<22}{'fps':>9}{'det/sec':>10}{'ms/frame':>10}{'faces':>8}{'recall':>8}")
+    for name, result in results.items():
+        print(f"{name:<22}{result['fps']:>9.1f}{result['detections_per_sec']:>10.1f}"
+              f"{result['ms_per_frame']:>10.2f}{result['detections']:>8}{result['recall']:>8.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'frames': len(frames), 'resolution': [width, height],
+                       'reference': reference_name, 'results': results}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
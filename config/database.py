@@ -6,4 +6,11 @@ DB_PASSWORD = ''  # Sesuaikan dengan password MySQL Anda
 DB_NAME = 'SAS_fr'
 
 # Connection String
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
\ No newline at end of file
+DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection Pool (dibagi oleh semua kamera/thread dalam satu proses)
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30  # detik menunggu koneksi bebas
+DB_POOL_RECYCLE = 1800  # detik, harus di bawah wait_timeout MySQL
+DB_POOL_PRE_PING = True
@@ -0,0 +1,13 @@
+# Metrics & Profiling
+METRICS_ENABLED = True  # timer/counter/histogram di hot path (overhead kecil)
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = None  # mis. 9108 untuk endpoint Prometheus http://127.0.0.1:9108/metrics
+METRICS_LOG_INTERVAL = None  # detik; mis. 60 untuk satu baris JSON ringkasan secara berkala
+METRICS_LOG_PATH = None  # None = stdout
+
+# Histogram latency (detik)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PROFILER = None  # 'cprofile' atau 'sampling'; toggle saat jalan dengan SIGUSR1
+PROFILE_DIR = 'data/profiles'
+PROFILE_SAMPLE_INTERVAL_MS = 5
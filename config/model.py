@@ -0,0 +1,63 @@
+# Recognition Configuration
+RECOGNITION_MODE = 'classifier'  # 'classifier' (softmax) atau 'embedding' (nearest-neighbor)
+CONFIDENCE_THRESHOLD = 0.7  # mode classifier: probabilitas softmax minimum
+SIMILARITY_THRESHOLD = 0.75  # mode embedding: cosine similarity minimum (kalibrasi sesuai data)
+CALIBRATION_TARGET_PRECISION = 0.98  # threshold per kelas dari validation split saat training
+
+# Temporal Smoothing (per track)
+SMOOTHING_ALPHA = 0.5  # bobot prediksi terbaru pada EMA vektor skor
+HYSTERESIS_MARGIN = 0.1  # identitas dilepas jika skor turun di bawah threshold - margin
+DECIDE_AFTER = 3  # inferensi berturut-turut dengan identitas sama -> track "decided", model berhenti
+
+# Model Files
+MODEL_PATH = 'data/models/face_recognition_model.h5'
+LABEL_ENCODER_PATH = 'data/models/label_encoder.pkl'
+EMBEDDING_INDEX_PATH = 'data/models/embedding_index.npz'
+CLASS_THRESHOLDS_PATH = 'data/models/class_thresholds.json'
+
+# Model Registry (versi model yang dipublish, hot-reload saat sistem absensi berjalan)
+MODEL_REGISTRY_DIR = 'data/models/registry'
+MODEL_HOT_RELOAD = True  # cek versi aktif di registry dan ganti model tanpa menghentikan kamera
+MODEL_POLL_INTERVAL = 5.0  # detik
+MODEL_KEEP_VERSIONS = 5  # versi lama di luar ini dihapus saat publish (versi aktif tidak pernah dihapus)
+
+# Inference Backend
+INFERENCE_BACKEND = 'auto'  # 'auto', 'keras', 'tflite', 'tflite_int8' atau 'onnx'
+INFERENCE_THREADS = None  # None = jumlah core CPU
+TFLITE_MODEL_PATH = 'data/models/face_recognition_model.tflite'
+TFLITE_INT8_MODEL_PATH = 'data/models/face_recognition_model_int8.tflite'
+ONNX_MODEL_PATH = 'data/models/face_recognition_model.onnx'
+BACKEND_REPORT_PATH = 'data/models/backend_report.json'
+
+# Face Detector
+FACE_DETECTOR = 'haar'  # 'haar', 'yunet' atau 'ssd' (DNN OpenCV, CPU)
+DETECTION_SCALE = 0.5  # deteksi di frame yang diperkecil, box dipetakan balik
+MIN_FACE_SIZE = 48  # px di frame asli
+MAX_FACE_SIZE = None
+DETECTION_ROI = True  # cari hanya di sekitar deteksi sebelumnya
+DETECTION_MOTION = False  # tambahkan area yang bergerak sebagai ROI
+FULL_SCAN_EVERY = 10  # scan full frame setiap N frame agar wajah baru tetap tertangkap
+YUNET_MODEL_PATH = 'data/models/face_detection_yunet_2023mar.onnx'
+SSD_PROTOTXT_PATH = 'data/models/deploy.prototxt'
+SSD_MODEL_PATH = 'data/models/res10_300x300_ssd_iter_140000.caffemodel'
+
+# Arsitektur Model (satu tempat untuk ukuran input dan jenis CNN)
+MODEL_ARCHITECTURE = 'baseline'  # 'baseline', 'baseline_gap', 'mobilenet' atau 'mobilenet_small'
+IMG_SIZE = (160, 160)  # input model (lebar, tinggi); dipakai preprocessing, training dan recognition
+# Bandingkan arsitektur/ukuran input: python benchmarks/benchmark_architectures.py
+
+# Data Collection
+# Crop wajah persegi, tidak lebih kecil dari input model (tidak pernah di-upscale saat training)
+CAPTURE_SIZE = (max(IMG_SIZE), max(IMG_SIZE))
+CAPTURE_INTERVAL = 0.2  # detik minimum antar foto pada auto-capture
+CAPTURE_HASH_DISTANCE = 8  # jarak Hamming dHash minimum (dari 64 bit) agar foto tidak dianggap duplikat
+
+# Training
+TRAIN_EPOCHS = 50  # batas atas; early stopping biasanya berhenti lebih awal
+EARLY_STOPPING_PATIENCE = 5  # epoch tanpa perbaikan val_loss sebelum berhenti
+LEARNING_RATE = 0.001
+WARM_START = True  # lanjutkan dari model terakhir (trunk conv dipakai ulang, head diperlebar untuk siswa baru)
+WARM_START_LEARNING_RATE = 0.0003
+MODEL_CLASSES_PATH = 'data/models/model_classes.json'  # urutan kelas pada output model tersimpan
+CHECKPOINT_DIR = 'data/models/checkpoints'  # checkpoint per epoch, training yang terputus dilanjutkan dari sini
+TRAINING_LOG_PATH = 'data/models/training_log.json'
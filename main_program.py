@@ -1,11 +1,9 @@
 import sys
 import os
-from datetime import date
-from src.face_detection_system import FaceRecognitionSystem
-from src.sistem_absensi import AttendanceSystem
-from src.create_cnn_model import train_model
-from src.preprocessing_data import preprocess_images
-from src.data_collection import collect_student_data
+from datetime import date, datetime
+
+# Modul berat (TensorFlow, OpenCV, sklearn, SQLAlchemy) di-import per opsi menu
+# agar menu langsung muncul dan opsi laporan tidak pernah memuat TensorFlow
 
 def main():
     print("=== Face Recognition Attendance System (Database Version) ===")
@@ -14,40 +12,68 @@ def main():
     print("3. Train Model")
     print("4. Run Attendance System")
     print("5. View Today's Attendance")
-    print("6. Export Attendance to Excel")
-    print("7. Exit")
+    print("6. Export Attendance (Excel/CSV/Parquet)")
+    print("7. Enroll Student (Embedding Index)")
+    print("8. Attendance Summary")
+    print("9. Exit")
     
     while True:
-        choice = input("\nChoose option (1-7): ")
+        choice = input("\nChoose option (1-9): ")
         
         if choice == '1':
+            from src.data_collection import collect_student_data
             student_name = input("Enter student name: ")
             num_photos = int(input("Number of photos to capture (default 50): ") or 50)
-            collect_student_data(student_name, num_photos)
+            auto = input("Auto-capture face crops? (Y/n): ").strip().lower() != 'n'
+            collect_student_data(student_name, num_photos, auto=auto)
             
         elif choice == '2':
+            from src.preprocessing_data import preprocess_images
             result = preprocess_images()
             if result[0] is None:
                 print("Preprocessing gagal. Silakan periksa data siswa.")
                 continue
             
         elif choice == '3':
+            from src.create_cnn_model import train_model
+            from src.model_export import export_models
             result = train_model()
             if result[0] is None:
                 print("Training gagal. Silakan periksa data preprocessing.")
                 continue
+
+            # Export model untuk runtime CPU yang lebih ringan (TFLite/ONNX)
+            quantize = input("Also export int8 quantized TFLite model? (y/N): ").strip().lower() == 'y'
+            export_models(result[0], quantize=quantize)
+
+            # Publish versi baru ke registry; sistem absensi yang berjalan memuatnya otomatis
+            from src.model_registry import publish_model
+            publish_model(result[0])
             
         elif choice == '4':
             if not os.path.exists('data/models/face_recognition_model.h5'):
                 print("Model not found! Please train the model first.")
                 continue
+            from src.sistem_absensi import AttendanceSystem
             attendance_system = AttendanceSystem()
-            attendance_system.run_attendance_system()
+            source = input("Video source (Enter for webcam, video file/image folder, or comma-separated list for multi-camera): ").strip() or 0
+            if isinstance(source, str) and ',' in source:
+                # Mode server: satu model, dedup dan writer DB untuk semua kamera
+                attendance_system.run_attendance_server([item.strip() for item in source.split(',') if item.strip()])
+                continue
+            pipelined = input("Use pipelined mode? (y/N): ").strip().lower() == 'y'
+            try:
+                if pipelined:
+                    attendance_system.run_attendance_pipeline(source)
+                else:
+                    attendance_system.run_attendance_system(source)
+            except FileNotFoundError as e:
+                print(f"Error: {e}")
             
         elif choice == '5':
             # View today's attendance
-            attendance_system = AttendanceSystem()
-            records = attendance_system.get_today_attendance()
+            from src.attendance_store import AttendanceStore
+            records = AttendanceStore().get_today_attendance()
             
             if not records:
                 print("No attendance records for today.")
@@ -57,14 +83,25 @@ def main():
                     print(f"ID: {record.id} | Name: {record.student_name} | Time: {record.time} | Status: {record.status}")
             
         elif choice == '6':
-            # Export to Excel
-            attendance_system = AttendanceSystem()
-            export_choice = input("Export (1) Today only or (2) All records? Enter 1 or 2: ")
+            # Export attendance (streaming)
+            from src.attendance_store import AttendanceStore
+            attendance_store = AttendanceStore()
+            export_choice = input("Export (1) Today only, (2) All records or (3) Date range? Enter 1, 2 or 3: ")
+            export_format = input("Format (xlsx/csv/parquet, default xlsx): ").strip().lower() or 'xlsx'
             
             if export_choice == '1':
-                result = attendance_system.export_to_excel(date.today())
+                result = attendance_store.export_attendance(date.today(), date.today(), fmt=export_format)
+            elif export_choice == '3':
+                try:
+                    start_date = datetime.strptime(input("Start date (dd-mm-yyyy): "), '%d-%m-%Y').date()
+                    end_date = datetime.strptime(input("End date (dd-mm-yyyy): "), '%d-%m-%Y').date()
+                except ValueError:
+                    print("Invalid date format!")
+                    continue
+                student_name = input("Student name (empty for all): ").strip() or None
+                result = attendance_store.export_attendance(start_date, end_date, student_name, fmt=export_format)
             else:
-                result = attendance_system.export_to_excel()
+                result = attendance_store.export_attendance(fmt=export_format)
             
             if result:
                 print("Export successful!")
@@ -72,11 +109,52 @@ def main():
                 print("Export failed!")
             
         elif choice == '7':
+            # Tambah siswa ke index embedding tanpa retrain model
+            if not os.path.exists('data/models/face_recognition_model.h5'):
+                print("Model not found! Please train the model first.")
+                continue
+            from src.face_detection_system import FaceRecognitionSystem
+            face_system = FaceRecognitionSystem(mode='embedding')
+            student_name = input("Enter student name (empty for all students): ").strip()
+            if student_name:
+                face_system.enroll_student(student_name)
+            elif os.path.isdir('data/students'):
+                for name in sorted(os.listdir('data/students')):
+                    if os.path.isdir(os.path.join('data/students', name)):
+                        face_system.enroll_student(name)
+            if face_system.version:
+                # Versi registry immutable: siswa baru dipublish sebagai versi baru (hot-reload)
+                from src.model_registry import publish_embedding_index
+                publish_embedding_index(face_system.version)
+            
+        elif choice == '8':
+            # Laporan dari tabel ringkasan (tanpa scan tabel attendance)
+            from src.attendance_store import AttendanceStore
+            from src.attendance_summary import print_attendance_report
+            attendance_store = AttendanceStore()
+            summary_choice = input("(1) Monthly report, (2) Yearly report or (3) Rebuild summaries? Enter 1, 2 or 3: ")
+            if summary_choice == '3':
+                attendance_store.backfill_summaries()
+                continue
+            try:
+                if summary_choice == '2':
+                    year, month = int(input("Year (yyyy): ")), None
+                else:
+                    period = datetime.strptime(input("Month (mm-yyyy): "), '%m-%Y')
+                    year, month = period.year, period.month
+            except ValueError:
+                print("Invalid date format!")
+                continue
+            student_name = input("Student name (empty for all): ").strip() or None
+            report = attendance_store.get_attendance_report(year, month, student_name)
+            print_attendance_report(report, f"Attendance {month:02d}-{year}" if month else f"Attendance {year}")
+
+        elif choice == '9':
             print("Goodbye!")
             break
             
         else:
-            print("Invalid choice! Please choose 1-7.")
+            print("Invalid choice! Please choose 1-9.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
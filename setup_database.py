@@ -7,7 +7,8 @@ Jalankan script ini untuk membuat database dan tabel yang diperlukan
 import mysql.connector
 from mysql.connector import Error
 from config.database import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
-from src.models import init_database
+from src.models import init_database, migrate_database
+from src.attendance_summary import backfill_summaries
 
 def create_database():
     """Create database if not exists"""
@@ -35,7 +36,7 @@ def create_database():
         print(f"Error creating database: {e}")
         return False
 
-def setup_database():
+def setup_database(dedupe=False):
     """Setup complete database"""
     print("=== Database Setup ===")
     
@@ -48,9 +49,24 @@ def setup_database():
     if not init_database():
         print("Failed to create tables!")
         return False
+
+    # Step 3: Migrate existing tables (indexes + unique constraint)
+    if not migrate_database(dedupe=dedupe):
+        print("Failed to migrate tables!")
+        return False
+
+    # Step 4: Rebuild summary tables from existing attendance rows
+    if not backfill_summaries():
+        print("Failed to build attendance summaries!")
+        return False
     
     print("Database setup completed successfully!")
     return True
 
 if __name__ == "__main__":
-    setup_database()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Create and migrate the attendance database")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Remove duplicate attendance rows (copied to attendance_duplicates first)")
+    args = parser.parse_args()
+    setup_database(dedupe=args.dedupe)
\ No newline at end of file
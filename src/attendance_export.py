@@ -0,0 +1,152 @@
+import csv
+import os
+import time
+from datetime import datetime
+from .models import iter_attendance_pages, Attendance
+
+EXPORT_COLUMNS = ['ID', 'Student Name', 'Date', 'Time', 'Status', 'Created At']
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+class _XlsxWriter:
+    def __init__(self, filename):
+        from openpyxl import Workbook
+        self.filename = filename
+        # write_only: baris langsung di-stream ke file, tidak disimpan di memori
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Attendance')
+        self.sheet.append(EXPORT_COLUMNS)
+
+    def write(self, rows):
+        for row in rows:
+            self.sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.filename)
+
+class _CsvWriter:
+    def __init__(self, filename):
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class _ParquetWriter:
+    def __init__(self, filename):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([
+            ('ID', pa.int64()),
+            ('Student Name', pa.string()),
+            ('Date', pa.string()),
+            ('Time', pa.string()),
+            ('Status', pa.string()),
+            ('Created At', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(filename, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+_WRITERS = {'xlsx': _XlsxWriter, 'csv': _CsvWriter, 'parquet': _ParquetWriter}
+
+def export_filename(start_date=None, end_date=None, student_name=None, fmt='xlsx'):
+    """Build the export file name from the filters"""
+    if start_date and start_date == end_date:
+        name = f"attendance_{start_date.strftime('%d_%m_%Y')}"
+    elif start_date or end_date:
+        start = start_date.strftime('%d_%m_%Y') if start_date else 'start'
+        end = end_date.strftime('%d_%m_%Y') if end_date else 'now'
+        name = f"attendance_{start}_to_{end}"
+    else:
+        name = f"all_attendance_{datetime.now().strftime('%d_%m_%Y')}"
+
+    if student_name:
+        name += f"_{student_name.replace(' ', '_')}"
+    return f"data/attendance_logs/{name}.{fmt}"
+
+def iter_attendance_rows(start_date=None, end_date=None, student_name=None, chunk_size=5000):
+    """Read attendance rows in chunks (keyset pagination, bounded memory on every driver)"""
+    conditions = []
+    if start_date:
+        conditions.append(Attendance.date >= start_date)
+    if end_date:
+        conditions.append(Attendance.date <= end_date)
+    if student_name:
+        conditions.append(Attendance.student_name == student_name)
+
+    columns = (Attendance.id, Attendance.student_name, Attendance.date,
+               Attendance.time, Attendance.status, Attendance.created_at)
+    for page in iter_attendance_pages(columns, conditions, chunk_size):
+        yield [
+            (
+                row.id,
+                row.student_name,
+                row.date.strftime('%d-%m-%Y'),
+                row.time,
+                row.status,
+                row.created_at.strftime('%d-%m-%Y %H:%M:%S') if row.created_at else '',
+            )
+            for row in page
+        ]
+
+def export_attendance(start_date=None, end_date=None, student_name=None, fmt='xlsx',
+                      filename=None, chunk_size=5000):
+    """Export attendance to xlsx/csv/parquet with roughly constant memory"""
+    if fmt not in EXPORT_FORMATS:
+        print(f"Unsupported export format: {fmt} (choose from {', '.join(EXPORT_FORMATS)})")
+        return False
+
+    filename = filename or export_filename(start_date, end_date, student_name, fmt)
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+
+    try:
+        writer = _WRITERS[fmt](filename)
+    except ImportError as e:
+        print(f"Export to {fmt} needs an extra package: {e}")
+        return False
+
+    total = 0
+    failed = False
+    started = time.perf_counter()
+    try:
+        for rows in iter_attendance_rows(start_date, end_date, student_name, chunk_size):
+            writer.write(rows)
+            total += len(rows)
+    except Exception as e:
+        print(f"Error exporting attendance: {e}")
+        failed = True
+    finally:
+        # Writer selalu ditutup (file handle / workbook tidak bocor saat error)
+        try:
+            writer.close()
+        except Exception as e:
+            print(f"Error writing {filename}: {e}")
+            failed = True
+
+    if failed:
+        if os.path.exists(filename):
+            os.remove(filename)
+        return False
+
+    if total == 0:
+        os.remove(filename)
+        print("No attendance records found!")
+        return False
+
+    elapsed = time.perf_counter() - started
+    print(f"Attendance data exported to {filename}")
+    print(f"Exported {total} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-6):.0f} rows/sec)")
+    return True
@@ -0,0 +1,298 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from .face_detector import create_detector
+from .face_preprocessor import FacePreprocessor
+from .face_tracker import FaceTracker
+from .frame_source import open_source
+from .metrics import metrics
+from .pipeline import LatestFrameGrabber, StageStats
+
+class ModelSwapped(Exception):
+    """A batch was preprocessed for the model that was just replaced"""
+
+class InferenceScheduler:
+    """Batches face crops from every stream into shared forward passes on one model"""
+    def __init__(self, face_system, max_batch=32, max_wait_ms=5.0, stats=None, attendance_system=None):
+        self.face_system = face_system
+        # Jika diberikan, model hot-reload ditukar di sini di antara dua batch
+        self.attendance_system = attendance_system
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = stats or StageStats()
+
+        self.requests = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, batch):
+        """Queue preprocessed faces; the Future resolves to (scores, face_system)
+
+        face_system is the model that produced the (N, C) scores; its class_names
+        and thresholds give the meaning of the columns (they change on hot-swap).
+        """
+        future = Future()
+        if len(batch) == 0:
+            face_system = self.face_system
+            future.set_result((face_system.score_batch(batch), face_system))
+        else:
+            self.requests.put((batch, future, time.perf_counter()))
+        return future
+
+    def _gather(self):
+        """Take requests until max_batch faces or max_wait after the first one"""
+        try:
+            first = self.requests.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        requests = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self):
+        while not self._stop.is_set() or not self.requests.empty():
+            requests = self._gather()
+            if not requests:
+                continue
+
+            if self.attendance_system is not None:
+                self.attendance_system.swap_model()
+                self.face_system = self.attendance_system.face_system
+                # Crop yang dibuat untuk model lama (ukuran/dtype beda) diminta ulang oleh stream-nya
+                width, height = self.face_system.img_size
+                compatible = []
+                for request in requests:
+                    batch = request[0]
+                    if batch.shape[1:] == (height, width, 3) and batch.dtype == self.face_system.input_dtype:
+                        compatible.append(request)
+                    else:
+                        request[1].set_exception(ModelSwapped())
+                requests = compatible
+                if not requests:
+                    continue
+
+            # Gabungkan crop semua stream ke buffer batch yang dipakai ulang
+            total = sum(len(batch) for batch, _, _ in requests)
+            buffer = self.face_system._get_batch_buffer(total)
+            offset = 0
+            for batch, _, _ in requests:
+                buffer[offset:offset + len(batch)] = batch
+                offset += len(batch)
+
+            face_system = self.face_system
+            start = time.perf_counter()
+            try:
+                scores = face_system.score_batch(buffer[:total])
+            except Exception as e:
+                for _, future, _ in requests:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            self.stats.record('predict', finished - start)
+            self.stats.increment('batches')
+            self.stats.increment('batched_faces', total)
+
+            offset = 0
+            for batch, future, queued_at in requests:
+                self.stats.record('queue_wait', start - queued_at)
+                future.set_result((scores[offset:offset + len(batch)], face_system))
+                offset += len(batch)
+
+    def average_batch(self):
+        batches = self.stats.counters.get('batches', 0)
+        return self.stats.counters.get('batched_faces', 0) / batches if batches else 0.0
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+class StreamWorker(threading.Thread):
+    """Per-camera decode, detection and tracking; recognition goes through the shared scheduler"""
+    def __init__(self, name, source, server):
+        super().__init__(daemon=True)
+        self.name = name
+        self.source = source
+        self.server = server
+        self.face_system = server.attendance_system.face_system
+        self.stats = StageStats()
+
+        # Detektor dan tracker per stream (state ROI/track tidak boleh tercampur antar kamera)
+        self.detector = create_detector()
+        self.tracker = FaceTracker()
+        # Buffer preprocessing sendiri, preprocessing berjalan paralel di thread kamera
+        self.preprocessor = FacePreprocessor(self.face_system.img_size, self.face_system.input_dtype, capacity=4)
+
+    @property
+    def class_names(self):
+        return self.face_system.class_names
+
+    @property
+    def thresholds(self):
+        return self.face_system.thresholds
+
+    def _sync_model(self, face_system=None):
+        """Follow a hot-reloaded model: new preprocessing params, undecided tracks start over"""
+        if face_system is None:
+            face_system = self.server.scheduler.face_system
+        if face_system is self.face_system:
+            return
+        self.face_system = face_system
+        self.tracker.reset_scores()
+        if (self.preprocessor.img_size, self.preprocessor.dtype) != (tuple(face_system.img_size), face_system.input_dtype):
+            self.preprocessor = FacePreprocessor(face_system.img_size, face_system.input_dtype, capacity=4)
+
+    def predict_scores(self, frame, boxes):
+        """Same interface as FaceRecognitionSystem.predict_scores, batched across streams"""
+        for _ in range(2):
+            with metrics.timer('preprocess'):
+                batch = self.preprocessor(frame, boxes)
+            try:
+                scores, face_system = self.server.scheduler.submit(batch).result()
+            except ModelSwapped:
+                self._sync_model()
+                continue
+            # Skor dari model yang sudah ditukar: kolom dipetakan dengan class_names/thresholds model itu
+            self._sync_model(face_system)
+            return scores
+        raise ModelSwapped()
+
+    def run(self):
+        cap = grabber = None
+        try:
+            # Sumber dibuka di dalam try: sumber yang salah menghentikan stream ini saja, dengan pesan
+            cap = open_source(self.source)
+            grabber = LatestFrameGrabber(cap, self.stats)
+            grabber.start()
+            while not self.server.stop_event.is_set():
+                frame, _ = grabber.get_latest(timeout=0.5)
+                if frame is None:
+                    if grabber.stopped.is_set():
+                        break
+                    continue
+
+                self._sync_model()
+                start = time.perf_counter()
+                faces = self.detector.detect(frame)
+                detected_at = time.perf_counter()
+                tracks = self.tracker.recognize(self, frame, faces)
+                recognized_at = time.perf_counter()
+
+                self.stats.record('detect', detected_at - start)
+                self.stats.record('recognize', recognized_at - detected_at)
+                self.stats.increment('processed')
+                self.stats.increment('faces', len(tracks))
+
+                for track in tracks:
+                    if track.decided:
+                        self.server.record(self.name, track.name)
+        except Exception as e:
+            print(f"[{self.name}] Stream stopped: {e}")
+        finally:
+            if grabber is not None:
+                grabber.stop()
+                grabber.join(timeout=2)
+            if cap is not None:
+                cap.release()
+
+class AttendanceServer:
+    """Run N camera/video streams against one model, one dedup state and one DB writer"""
+    def __init__(self, sources, attendance_system=None, max_batch=32, max_wait_ms=5.0, report_interval=10.0):
+        if attendance_system is None:
+            from .sistem_absensi import AttendanceSystem
+            attendance_system = AttendanceSystem(write_behind=True)
+        self.attendance_system = attendance_system
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+
+        self.scheduler = InferenceScheduler(attendance_system.face_system, max_batch, max_wait_ms,
+                                            attendance_system=attendance_system)
+        if isinstance(sources, dict):
+            sources = list(sources.items())
+        else:
+            sources = [(f"cam{i}", source) for i, source in enumerate(sources)]
+        self.workers = [StreamWorker(name, source, self) for name, source in sources]
+        self.recorded = {}  # stream -> jumlah absensi yang dicatat
+
+    def record(self, stream_name, student_name):
+        # record_attendance memakai cache/dedup global milik AttendanceSystem (aman antar thread)
+        success, _ = self.attendance_system.record_attendance(student_name)
+        if success:
+            self.recorded[stream_name] = self.recorded.get(stream_name, 0) + 1
+            print(f"[{stream_name}] {student_name} attendance recorded at {datetime.now().strftime('%H:%M:%S')}")
+        return success
+
+    def report(self):
+        lines = [f"Inference: {self.scheduler.stats.counters.get('batches', 0)} batches, "
+                 f"avg {self.scheduler.average_batch():.1f} faces/batch"]
+        for stage, values in self.scheduler.stats.summary().items():
+            lines.append(f"  {stage:<12} p50 {values['p50_ms']:7.1f} ms | p95 {values['p95_ms']:7.1f} ms")
+        for worker in self.workers:
+            lines.append(f"[{worker.name}] {worker.stats.fps('processed'):.1f} fps | "
+                         f"dropped {worker.stats.counters.get('dropped_frames', 0)} | "
+                         f"recorded {self.recorded.get(worker.name, 0)}")
+        return "\n".join(lines)
+
+    def run(self):
+        print(f"Starting attendance server with {len(self.workers)} streams. Press Ctrl+C to stop.")
+        self.scheduler.start()
+        for worker in self.workers:
+            worker.start()
+
+        last_report = time.perf_counter()
+        try:
+            while any(worker.is_alive() for worker in self.workers):
+                time.sleep(0.2)
+                if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                    print(self.report())
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            for worker in self.workers:
+                worker.join(timeout=5)
+            self.scheduler.stop()
+            self.attendance_system.close()
+
+        print("=== Server Statistics ===")
+        print(self.report())
+        return self
+
+if __name__ == "__main__":
+    import argparse
+    from config.metrics import METRICS_PORT, METRICS_LOG_INTERVAL, PROFILER
+    parser = argparse.ArgumentParser(description="Multi-camera attendance server")
+    parser.add_argument('sources', nargs='+', help="Camera indexes, video files, image folders or synthetic[:WxH]")
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    # Default dari config/metrics.py; argumen CLI hanya menimpa jika diberikan
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help="Serve Prometheus metrics on this port")
+    parser.add_argument('--metrics-log-interval', type=float, default=METRICS_LOG_INTERVAL,
+                        help="Print a JSON metrics line every N seconds")
+    parser.add_argument('--profile', choices=['cprofile', 'sampling'], default=PROFILER,
+                        help="Profile the run (toggle with SIGUSR1)")
+    args = parser.parse_args()
+
+    from .metrics import MetricsRuntime
+    from .sistem_absensi import AttendanceSystem
+    attendance_system = AttendanceSystem(write_behind=True, metrics_runtime=MetricsRuntime(
+        port=args.metrics_port, log_interval=args.metrics_log_interval, profiler=args.profile))
+    AttendanceServer(args.sources, attendance_system=attendance_system,
+                     max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).run()
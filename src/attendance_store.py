@@ -0,0 +1,44 @@
+from datetime import date
+from .attendance_export import export_attendance
+from .attendance_summary import backfill_summaries, get_daily_summary, get_attendance_report
+from .models import session_scope, Attendance, init_database
+
+class AttendanceStore:
+    """Database-only attendance queries and exports (no camera, OpenCV or TensorFlow)"""
+    def __init__(self):
+        if not init_database():
+            print("Warning: Database initialization failed!")
+
+    def get_today_attendance(self):
+        """Get today's attendance records"""
+        return self.get_attendance_by_date(date.today())
+
+    def get_attendance_by_date(self, target_date):
+        """Get attendance records by specific date"""
+        try:
+            with session_scope() as db:
+                return db.query(Attendance).filter(Attendance.date == target_date).all()
+        except Exception as e:
+            print(f"Error getting attendance records: {e}")
+            return []
+
+    def export_to_excel(self, target_date=None):
+        """Export attendance data to Excel file"""
+        return export_attendance(start_date=target_date, end_date=target_date, fmt='xlsx')
+
+    def export_attendance(self, start_date=None, end_date=None, student_name=None, fmt='xlsx'):
+        """Stream attendance data to xlsx/csv/parquet with date-range and student filters"""
+        return export_attendance(start_date=start_date, end_date=end_date,
+                                 student_name=student_name, fmt=fmt)
+
+    def get_daily_summary(self, start_date=None, end_date=None):
+        """Daily attendance totals from the summary table"""
+        return get_daily_summary(start_date, end_date)
+
+    def get_attendance_report(self, year, month=None, student_name=None):
+        """Per-student attendance rate for a month or a whole year (summary tables, no raw scan)"""
+        return get_attendance_report(year, month, student_name)
+
+    def backfill_summaries(self, start_date=None, end_date=None):
+        """Rebuild the summary tables from the raw attendance rows"""
+        return backfill_summaries(start_date, end_date)
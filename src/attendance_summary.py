@@ -0,0 +1,250 @@
+import calendar
+import time
+from datetime import date
+from sqlalchemy import select, delete, insert, func, cast, literal, Integer
+from .models import session_scope, iter_attendance_pages, Attendance, DailyAttendanceSummary, StudentMonthlySummary
+
+def _seconds(time_str):
+    hours, minutes, seconds = (int(part) for part in time_str.split(':'))
+    return hours * 3600 + minutes * 60 + seconds
+
+def _format_seconds(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def _month_range(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+class _Aggregator:
+    """Daily and per-student monthly totals built from (student_name, date, time) rows"""
+    def __init__(self):
+        self.daily = {}
+        self.monthly = {}
+
+    def add_daily(self, record_date, time_str):
+        day = self.daily.get(record_date)
+        if day is None:
+            self.daily[record_date] = {'date': record_date, 'present_count': 1,
+                                       'first_arrival': time_str, 'last_arrival': time_str}
+            return
+        day['present_count'] += 1
+        day['first_arrival'] = min(day['first_arrival'], time_str)
+        day['last_arrival'] = max(day['last_arrival'], time_str)
+
+    def add_monthly(self, student_name, record_date, time_str):
+        key = (student_name, record_date.year, record_date.month)
+        month = self.monthly.get(key)
+        if month is None:
+            self.monthly[key] = {'student_name': student_name, 'year': record_date.year,
+                                 'month': record_date.month, 'days_present': 1, 'first_date': record_date,
+                                 'last_date': record_date, 'arrival_seconds': _seconds(time_str)}
+            return
+        month['days_present'] += 1
+        month['first_date'] = min(month['first_date'], record_date)
+        month['last_date'] = max(month['last_date'], record_date)
+        month['arrival_seconds'] += _seconds(time_str)
+
+    def add(self, student_name, record_date, time_str):
+        self.add_daily(record_date, time_str)
+        self.add_monthly(student_name, record_date, time_str)
+
+def _arrival_seconds():
+    """SQL expression: attendance time 'HH:MM:SS' in seconds (MySQL and SQLite)"""
+    part = lambda start: cast(func.substr(Attendance.time, start, 2), Integer)
+    return part(1) * 3600 + part(4) * 60 + part(7)
+
+def _upsert_from_select(db, table, columns, query, key_columns):
+    """INSERT ... SELECT that overwrites existing summary rows in the same statement"""
+    if db.get_bind().dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).from_select(columns, query)
+        stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column]
+                                             for column in columns if column not in key_columns})
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).from_select(columns, query)
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_={
+            column: stmt.excluded[column] for column in columns if column not in key_columns})
+    db.execute(stmt)
+
+def refresh_summaries(db, keys):
+    """Recompute the summary rows touched by newly inserted (student_name, date) keys
+
+    Runs inside the inserting transaction. Totals are aggregated by the database
+    over the affected days and student-months only (attendance indexes) and
+    written with INSERT ... SELECT ... ON DUPLICATE KEY UPDATE, so it is
+    idempotent (safe with INSERT IGNORE retries) and stations sharing one
+    database never hit duplicate-key errors or overwrite each other's counts
+    with a stale read.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    months = {}
+    for student_name, record_date in keys:
+        months.setdefault((record_date.year, record_date.month), set()).add(student_name)
+
+    # Per hari: ix_attendance_date_student
+    daily = (select(Attendance.date, func.count(), func.min(Attendance.time), func.max(Attendance.time), func.now())
+             .where(Attendance.date.in_({record_date for _, record_date in keys}))
+             .group_by(Attendance.date))
+    _upsert_from_select(db, DailyAttendanceSummary.__table__,
+                        ['date', 'present_count', 'first_arrival', 'last_arrival', 'updated_at'], daily, ['date'])
+
+    # Per siswa per bulan: uq_attendance_student_date (student_name, date)
+    for (year, month), student_names in months.items():
+        start, end = _month_range(year, month)
+        monthly = (select(Attendance.student_name, literal(year, Integer), literal(month, Integer), func.count(),
+                          func.min(Attendance.date), func.max(Attendance.date), func.sum(_arrival_seconds()),
+                          func.now())
+                   .where(Attendance.student_name.in_(student_names), Attendance.date >= start,
+                          Attendance.date <= end)
+                   .group_by(Attendance.student_name))
+        _upsert_from_select(db, StudentMonthlySummary.__table__,
+                            ['student_name', 'year', 'month', 'days_present', 'first_date', 'last_date',
+                             'arrival_seconds', 'updated_at'], monthly, ['student_name', 'year', 'month'])
+
+def backfill_summaries(start_date=None, end_date=None, chunk_size=5000):
+    """Rebuild the summary tables from the raw attendance rows in one streaming pass"""
+    # Rentang diperluas ke bulan penuh agar ringkasan bulanan tidak terpotong
+    if start_date:
+        start_date = start_date.replace(day=1)
+    if end_date:
+        end_date = _month_range(end_date.year, end_date.month)[1]
+
+    conditions = []
+    daily_delete = delete(DailyAttendanceSummary)
+    monthly_delete = delete(StudentMonthlySummary)
+    period = StudentMonthlySummary.year * 100 + StudentMonthlySummary.month
+    if start_date:
+        conditions.append(Attendance.date >= start_date)
+        daily_delete = daily_delete.where(DailyAttendanceSummary.date >= start_date)
+        monthly_delete = monthly_delete.where(period >= start_date.year * 100 + start_date.month)
+    if end_date:
+        conditions.append(Attendance.date <= end_date)
+        daily_delete = daily_delete.where(DailyAttendanceSummary.date <= end_date)
+        monthly_delete = monthly_delete.where(period <= end_date.year * 100 + end_date.month)
+
+    aggregator = _Aggregator()
+    total = 0
+    started = time.perf_counter()
+    try:
+        columns = (Attendance.id, Attendance.student_name, Attendance.date, Attendance.time)
+        for page in iter_attendance_pages(columns, conditions, chunk_size):
+            for row in page:
+                aggregator.add(row.student_name, row.date, row.time)
+            total += len(page)
+
+        # Ganti ringkasan dalam rentang dalam satu transaksi
+        with session_scope() as db:
+            db.execute(daily_delete)
+            db.execute(monthly_delete)
+            if aggregator.daily:
+                db.execute(insert(DailyAttendanceSummary), list(aggregator.daily.values()))
+            if aggregator.monthly:
+                db.execute(insert(StudentMonthlySummary), list(aggregator.monthly.values()))
+    except Exception as e:
+        print(f"Error backfilling attendance summaries: {e}")
+        return False
+
+    elapsed = time.perf_counter() - started
+    print(f"Summaries rebuilt from {total} attendance rows: {len(aggregator.daily)} days, "
+          f"{len(aggregator.monthly)} student-months in {elapsed:.2f}s")
+    return True
+
+def get_daily_summary(start_date=None, end_date=None):
+    """Daily totals between start_date and end_date (inclusive)"""
+    stmt = select(DailyAttendanceSummary).order_by(DailyAttendanceSummary.date)
+    if start_date:
+        stmt = stmt.where(DailyAttendanceSummary.date >= start_date)
+    if end_date:
+        stmt = stmt.where(DailyAttendanceSummary.date <= end_date)
+
+    try:
+        with session_scope() as db:
+            return db.execute(stmt).scalars().all()
+    except Exception as e:
+        print(f"Error getting daily summary: {e}")
+        return []
+
+def get_attendance_report(year, month=None, student_name=None):
+    """Per-student attendance rate for one month (or a whole year) from the summary tables"""
+    if month:
+        start, end = _month_range(year, month)
+    else:
+        start, end = date(year, 1, 1), date(year, 12, 31)
+
+    # Hari sekolah = hari dengan minimal satu siswa hadir
+    days_stmt = select(func.count()).select_from(DailyAttendanceSummary).where(
+        DailyAttendanceSummary.date >= start, DailyAttendanceSummary.date <= end,
+        DailyAttendanceSummary.present_count > 0)
+    months_stmt = select(StudentMonthlySummary).where(StudentMonthlySummary.year == year)
+    if month:
+        months_stmt = months_stmt.where(StudentMonthlySummary.month == month)
+    if student_name:
+        months_stmt = months_stmt.where(StudentMonthlySummary.student_name == student_name)
+
+    try:
+        with session_scope() as db:
+            school_days = db.execute(days_stmt).scalar() or 0
+            monthly_rows = db.execute(months_stmt).scalars().all()
+    except Exception as e:
+        print(f"Error getting attendance report: {e}")
+        return []
+
+    students = {}
+    for row in monthly_rows:
+        student = students.setdefault(row.student_name, {
+            'student_name': row.student_name, 'days_present': 0, 'arrival_seconds': 0,
+            'first_date': row.first_date, 'last_date': row.last_date,
+        })
+        student['days_present'] += row.days_present
+        student['arrival_seconds'] += row.arrival_seconds
+        student['first_date'] = min(student['first_date'], row.first_date)
+        student['last_date'] = max(student['last_date'], row.last_date)
+
+    report = []
+    for student in sorted(students.values(), key=lambda item: item['student_name']):
+        arrival_seconds = student.pop('arrival_seconds')
+        student['school_days'] = school_days
+        student['attendance_rate'] = student['days_present'] / school_days if school_days else 0.0
+        student['average_arrival'] = _format_seconds(arrival_seconds / student['days_present'])
+        report.append(student)
+    return report
+
+def print_attendance_report(report, title):
+    if not report:
+        print("No attendance summary for this period. Run the backfill if the tables are new.")
+        return
+    print(f"\n=== {title} ({report[0]['school_days']} school days) ===")
+    for row in report:
+        print(f"{row['student_name']:<25} {row['days_present']:>4} days | {row['attendance_rate']:6.1%} | "
+              f"avg arrival {row['average_arrival']}")
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+    from .models import init_database
+
+    parser = argparse.ArgumentParser(description="Attendance summary tables")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = subparsers.add_parser('backfill', help="Rebuild summaries from the attendance table")
+    backfill_parser.add_argument('--start', help="dd-mm-yyyy")
+    backfill_parser.add_argument('--end', help="dd-mm-yyyy")
+    report_parser = subparsers.add_parser('report', help="Attendance rate per student")
+    report_parser.add_argument('year', type=int)
+    report_parser.add_argument('month', type=int, nargs='?')
+    report_parser.add_argument('--student')
+    args = parser.parse_args()
+
+    init_database()
+    if args.command == 'backfill':
+        parse = lambda value: datetime.strptime(value, '%d-%m-%Y').date() if value else None
+        backfill_summaries(parse(args.start), parse(args.end))
+    else:
+        started = time.perf_counter()
+        report = get_attendance_report(args.year, args.month, args.student)
+        title = f"{args.year}-{args.month:02d}" if args.month else str(args.year)
+        print_attendance_report(report, f"Attendance {title}")
+        print(f"Report generated in {(time.perf_counter() - started) * 1000:.1f} ms")
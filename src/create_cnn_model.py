@@ -1,16 +1,30 @@
 from sklearn.preprocessing import LabelEncoder
 import tensorflow as tf
 from tensorflow.keras.models import Sequential # type: ignore
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout # type: ignore
+from tensorflow.keras.layers import (Conv2D, MaxPooling2D, Flatten, Dense, Dropout, UnitNormalization, Input, Rescaling, # type: ignore
+                                     DepthwiseConv2D, BatchNormalization, ReLU, GlobalAveragePooling2D)
 from tensorflow.keras.optimizers import Adam # type: ignore
 from sklearn.model_selection import train_test_split
 import numpy as np
 import pickle
+import json
 import os
+import shutil
+import sys
+import time
 
-def create_cnn_model(input_shape, num_classes):
-    model = Sequential([
-        Conv2D(32, (3, 3), activation='relu', input_shape=input_shape),
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (MODEL_PATH, MODEL_ARCHITECTURE, IMG_SIZE, CONFIDENCE_THRESHOLD, CALIBRATION_TARGET_PRECISION, CLASS_THRESHOLDS_PATH,
+                          TRAIN_EPOCHS, EARLY_STOPPING_PATIENCE, LEARNING_RATE, WARM_START, WARM_START_LEARNING_RATE,
+                          MODEL_CLASSES_PATH, CHECKPOINT_DIR, TRAINING_LOG_PATH)
+
+def _input_layers(input_shape):
+    # Input piksel uint8 mentah, normalisasi di dalam model (tanpa konversi float per wajah saat runtime)
+    return [Input(shape=input_shape, dtype='uint8'), Rescaling(1.0 / 255)]
+
+def _baseline_trunk():
+    return [
+        Conv2D(32, (3, 3), activation='relu'),
         MaxPooling2D((2, 2)),
 
         Conv2D(64, (3, 3), activation='relu'),
@@ -21,17 +35,251 @@ def create_cnn_model(input_shape, num_classes):
 
         Conv2D(128, (3, 3), activation='relu'),
         MaxPooling2D((2, 2)),
+    ]
 
+def baseline(input_shape, num_classes):
+    """Original CNN: 4 conv blocks, Flatten -> Dense(512) (most of the params/FLOPs are in the Dense)"""
+    return Sequential(_input_layers(input_shape) + _baseline_trunk() + [
         Flatten(),
         Dropout(0.5),
         Dense(512, activation='relu'),
         Dropout(0.5),
         Dense(num_classes, activation='softmax')
-    ])
+    ], name='baseline')
+
+def baseline_gap(input_shape, num_classes):
+    """Same conv trunk with a global-average-pooling head instead of Flatten"""
+    return Sequential(_input_layers(input_shape) + _baseline_trunk() + [
+        GlobalAveragePooling2D(),
+        Dropout(0.3),
+        Dense(256, activation='relu'),
+        Dropout(0.3),
+        Dense(num_classes, activation='softmax')
+    ], name='baseline_gap')
+
+def _separable_block(filters, strides=1):
+    """MobileNet block: depthwise 3x3 + pointwise 1x1, each with BatchNorm and ReLU6"""
+    return [
+        DepthwiseConv2D((3, 3), strides=strides, padding='same', use_bias=False),
+        BatchNormalization(),
+        ReLU(6.0),
+        Conv2D(filters, (1, 1), use_bias=False),
+        BatchNormalization(),
+        ReLU(6.0),
+    ]
+
+def mobilenet(input_shape, num_classes, width=1.0, name='mobilenet'):
+    """MobileNet-style CNN of depthwise-separable blocks with a global-average-pooling head"""
+    def channels(filters):
+        return max(8, int(filters * width))
+
+    layers = _input_layers(input_shape) + [
+        Conv2D(channels(32), (3, 3), strides=2, padding='same', use_bias=False),
+        BatchNormalization(),
+        ReLU(6.0),
+    ]
+    # (filters, stride): resolusi turun 32x total, sama seperti MobileNet
+    for filters, strides in [(64, 1), (128, 2), (128, 1), (256, 2), (256, 1), (512, 2), (512, 1), (1024, 2)]:
+        layers += _separable_block(channels(filters), strides)
+    layers += [
+        GlobalAveragePooling2D(),
+        Dropout(0.3),
+        Dense(256, activation='relu'),
+        Dropout(0.3),
+        Dense(num_classes, activation='softmax')
+    ]
+    return Sequential(layers, name=name)
+
+def mobilenet_small(input_shape, num_classes):
+    """MobileNet-style CNN at half width (~4x fewer MACs)"""
+    return mobilenet(input_shape, num_classes, width=0.5, name='mobilenet_small')
+
+ARCHITECTURES = {
+    'baseline': baseline,
+    'baseline_gap': baseline_gap,
+    'mobilenet': mobilenet,
+    'mobilenet_small': mobilenet_small,
+}
+
+def create_cnn_model(input_shape, num_classes, architecture=MODEL_ARCHITECTURE):
+    if architecture not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture: {architecture} (choose from {', '.join(ARCHITECTURES)})")
+    return ARCHITECTURES[architecture](input_shape, num_classes)
+
+def build_embedding_model(model):
+    """Reuse a trained classifier trunk as an L2-normalized embedding model"""
+    dense_layers = [layer for layer in model.layers if isinstance(layer, Dense)]
+    if len(dense_layers) < 2:
+        raise ValueError("Model needs a hidden Dense layer before the softmax head")
 
+    # Output layer sebelum head softmax dipakai sebagai embedding
+    embeddings = UnitNormalization(axis=-1)(dense_layers[-2].output)
+    return tf.keras.Model(model.inputs, embeddings)
+
+def load_model_classes(path=MODEL_CLASSES_PATH):
+    """Class names in the output order of the saved model (None if unknown)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def warm_start_model(input_shape, class_names, model_path=MODEL_PATH, classes_path=MODEL_CLASSES_PATH,
+                     architecture=MODEL_ARCHITECTURE):
+    """New model for class_names initialised from the saved one; only the softmax head is widened"""
+    if not os.path.exists(model_path):
+        return None
+
+    previous = tf.keras.models.load_model(model_path, compile=False)
+    previous_classes = load_model_classes(classes_path)
+    if previous_classes is None:
+        # Model lama tanpa daftar kelas: hanya aman jika jumlah kelas sama (urutan LabelEncoder)
+        if previous.output_shape[-1] != len(class_names):
+            print("Warm start skipped: class list of the previous model is unknown")
+            return None
+        previous_classes = [str(name) for name in class_names]
+
+    model = create_cnn_model(input_shape, len(class_names), architecture)
+    # Model lama (sebelum ada pilihan arsitektur) bernama 'sequential*' dan dicek lewat bentuk layer saja
+    different = previous.name in ARCHITECTURES and previous.name != model.name
+    if different or previous.input_shape[1:] != model.input_shape[1:] or len(previous.layers) != len(model.layers):
+        print("Warm start skipped: previous model has a different architecture")
+        return None
+
+    try:
+        # Semua layer kecuali head softmax disalin apa adanya
+        for layer, previous_layer in zip(model.layers[:-1], previous.layers[:-1]):
+            layer.set_weights(previous_layer.get_weights())
+    except ValueError as e:
+        print(f"Warm start skipped: {e}")
+        return None
+
+    # Head: kolom kelas lama dipindah ke posisi barunya, kelas baru tetap inisialisasi acak
+    kernel, bias = model.layers[-1].get_weights()
+    previous_kernel, previous_bias = previous.layers[-1].get_weights()
+    position = {name: i for i, name in enumerate(previous_classes)}
+    reused = 0
+    for i, name in enumerate(class_names):
+        j = position.get(str(name))
+        if j is None:
+            # Bias rata-rata agar kelas baru tidak langsung kalah dari kelas lama
+            bias[i] = previous_bias.mean()
+        else:
+            kernel[:, i], bias[i] = previous_kernel[:, j], previous_bias[j]
+            reused += 1
+    model.layers[-1].set_weights([kernel, bias])
+
+    print(f"Warm start from {model_path}: {reused} existing classes, {len(class_names) - reused} new")
     return model
 
-def train_model():
+class EpochTimer(tf.keras.callbacks.Callback):
+    """Wall-clock time and metrics of every epoch, written to the training log"""
+    def __init__(self):
+        super().__init__()
+        self.epochs = []
+        self._started = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._started = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        entry = {'epoch': epoch + 1, 'seconds': round(time.perf_counter() - self._started, 3)}
+        entry.update({key: float(value) for key, value in (logs or {}).items()})
+        self.epochs.append(entry)
+
+def _prepare_checkpoint_dir(checkpoint_dir, run_config):
+    """Keep an interrupted run's checkpoint only if it was for the same classes/settings"""
+    config_path = os.path.join(checkpoint_dir, 'run_config.json')
+    if os.path.exists(config_path):
+        with open(config_path) as f:
+            previous = json.load(f)
+        if previous == run_config:
+            print(f"Resuming interrupted training from {checkpoint_dir}")
+            return
+        print("Discarding checkpoint of an interrupted run with different classes/settings")
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(config_path, 'w') as f:
+        json.dump(run_config, f, indent=2)
+
+def make_dataset(X, y, indices, batch_size=32, shuffle=False, augment=False, shuffle_buffer=10000, seed=42,
+                 img_size=None):
+    """tf.data pipeline that gathers batches from the (memory-mapped) arrays by index
+
+    img_size: (width, height) the model expects; batches are resized when the
+    cached arrays were preprocessed at another size.
+    """
+    indices = np.asarray(indices, dtype='int64')
+    sample_shape = X.shape[1:]
+    resize = img_size is not None and tuple(sample_shape[:2]) != (img_size[1], img_size[0])
+
+    def load_batch(batch_indices):
+        # Urutkan agar pembacaan memmap berurutan di disk
+        batch_indices = np.sort(batch_indices)
+        return np.asarray(X[batch_indices]), np.asarray(y[batch_indices], dtype='int64')
+
+    def to_tensors(batch_indices):
+        images, labels = tf.numpy_function(load_batch, [batch_indices], [tf.as_dtype(X.dtype), tf.int64])
+        images.set_shape((None,) + sample_shape)
+        labels.set_shape((None,))
+        return images, labels
+
+    def to_pixels(images, labels):
+        # Model menormalisasi sendiri (Rescaling) -> dataset memberi piksel uint8 0..255
+        if X.dtype != np.uint8:
+            images = tf.cast(tf.round(tf.clip_by_value(images, 0.0, 1.0) * 255.0), tf.uint8)
+        if resize:
+            # Ukuran input lain (mis. 96x96) tanpa preprocessing ulang seluruh dataset
+            images = tf.image.resize(images, (img_size[1], img_size[0]), antialias=True)
+            images = tf.cast(tf.round(tf.clip_by_value(images, 0.0, 255.0)), tf.uint8)
+        return images, labels
+
+    def random_augment(images, labels):
+        images = tf.image.random_flip_left_right(tf.cast(images, tf.float32))
+        images = tf.image.random_brightness(images, 0.1 * 255.0)
+        return tf.cast(tf.round(tf.clip_by_value(images, 0.0, 255.0)), tf.uint8), labels
+
+    dataset = tf.data.Dataset.from_tensor_slices(indices)
+    if shuffle:
+        dataset = dataset.shuffle(min(len(indices), shuffle_buffer), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(to_tensors, num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.map(to_pixels, num_parallel_calls=tf.data.AUTOTUNE)
+    if augment:
+        dataset = dataset.map(random_augment, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def calibrate_thresholds(probabilities, labels, class_names, target_precision=CALIBRATION_TARGET_PRECISION,
+                         default=CONFIDENCE_THRESHOLD, min_samples=5, bounds=(CONFIDENCE_THRESHOLD, 0.95)):
+    """Per-class softmax threshold: the lowest one that keeps precision >= target on held-out data
+
+    Validation data is closed-set (no unknown faces), so calibration may only raise
+    a threshold above CONFIDENCE_THRESHOLD, never lower it.
+    """
+    predicted = np.argmax(probabilities, axis=1)
+    top = probabilities[np.arange(len(predicted)), predicted]
+    thresholds = {}
+
+    for class_id, class_name in enumerate(class_names):
+        selected = predicted == class_id
+        if np.sum(labels[selected] == class_id) < min_samples:
+            # Data validasi terlalu sedikit untuk kalibrasi -> pakai threshold global
+            thresholds[str(class_name)] = float(default)
+            continue
+
+        # Urutkan prediksi kelas ini dari skor tertinggi; precision kumulatif per kandidat threshold
+        order = np.argsort(-top[selected])
+        scores = top[selected][order]
+        correct = (labels[selected][order] == class_id).astype('float64')
+        precision = np.cumsum(correct) / np.arange(1, len(correct) + 1)
+
+        passing = np.nonzero(precision >= target_precision)[0]
+        threshold = scores[passing[-1]] if len(passing) else bounds[1]
+        thresholds[str(class_name)] = float(np.clip(threshold, *bounds))
+
+    return thresholds
+
+def train_model(batch_size=32, augment=False, warm_start=WARM_START, epochs=TRAIN_EPOCHS,
+                patience=EARLY_STOPPING_PATIENCE, resume=True):
     # Cek apakah file training data ada
     if not os.path.exists('data/training_data/X_train.npy'):
         print("Error: File training data tidak ditemukan!")
@@ -47,47 +295,114 @@ def train_model():
     os.makedirs('data/models', exist_ok=True)
     
     # Load preprocessed data
-    X = np.load('data/training_data/X_train.npy')
+    # mmap: data dibaca per batch dari disk, tidak dimuat seluruhnya ke RAM
+    X = np.load('data/training_data/X_train.npy', mmap_mode='r')
     y = np.load('data/training_data/y_train.npy')
+
+    with open('data/models/label_encoder.pkl', 'rb') as f:
+        label_encoder = pickle.load(f)
+    class_names = [str(name) for name in label_encoder.classes_]
     
     print(f"Loaded training data: {X.shape[0]} samples, {len(np.unique(y))} classes")
 
-    # Split data into training and validation sets
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Split by index (tanpa menyalin array gambar)
+    train_idx, val_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    train_ds = make_dataset(X, y, train_idx, batch_size=batch_size, shuffle=True, augment=augment, img_size=IMG_SIZE)
+    val_ds = make_dataset(X, y, val_idx, batch_size=batch_size, img_size=IMG_SIZE)
+    input_shape = (IMG_SIZE[1], IMG_SIZE[0], 3)
 
-    # Create CNN model
-    num_classes=len(np.unique(y))
-    model = create_cnn_model(input_shape=X.shape[1:], num_classes=num_classes)
+    # Warm start: trunk conv dari model terakhir, fallback ke model baru
+    model = warm_start_model(input_shape, class_names) if warm_start else None
+    warm_started = model is not None
+    if model is None:
+        model = create_cnn_model(input_shape=input_shape, num_classes=len(class_names))
 
     # Compile model
-    model.compile(optimizer=Adam(learning_rate=0.001), 
+    model.compile(optimizer=Adam(learning_rate=WARM_START_LEARNING_RATE if warm_started else LEARNING_RATE),
                   loss='sparse_categorical_crossentropy', 
                   metrics=['accuracy'])
 
     print("Model Summary:")
     model.summary()
 
+    # Checkpoint per epoch (model + optimizer + epoch), dihapus otomatis setelah training selesai
+    run_config = {'classes': class_names, 'samples': int(len(y)), 'input_shape': list(input_shape),
+                  'architecture': model.name, 'warm_start': warm_started, 'batch_size': batch_size}
+    if not resume:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+    _prepare_checkpoint_dir(CHECKPOINT_DIR, run_config)
+
+    timer = EpochTimer()
+    callbacks = [
+        tf.keras.callbacks.BackupAndRestore(CHECKPOINT_DIR),
+        tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True),
+        timer,
+    ]
+
     # Train model
-    history = model.fit(X_train, 
-                        y_train, 
-                        validation_data=(X_val, y_val), 
-                        epochs=50, 
-                        batch_size=32,
+    started = time.perf_counter()
+    history = model.fit(train_ds,
+                        validation_data=val_ds,
+                        epochs=epochs,
+                        callbacks=callbacks,
                         verbose=1)
+    elapsed = time.perf_counter() - started
 
     # Save model
-    model.save('data/models/face_recognition_model.h5')
+    model.save(MODEL_PATH)
+    with open(MODEL_CLASSES_PATH, 'w') as f:
+        json.dump(class_names, f, indent=2)
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
 
-    # Load and save the fitted label encoder
-    with open('data/models/label_encoder.pkl', 'rb') as f:
-        label_encoder = pickle.load(f)
-    
-    with open('data/models/label_encoder.pkl', 'wb') as f:
-        pickle.dump(label_encoder, f)
+    # Kalibrasi threshold per kelas pada validation split (dipakai FaceRecognitionSystem)
+    probabilities, labels = [], []
+    for images, batch_labels in val_ds:
+        probabilities.append(model.predict_on_batch(images))
+        labels.append(batch_labels.numpy())
+    thresholds = calibrate_thresholds(np.concatenate(probabilities), np.concatenate(labels),
+                                      label_encoder.classes_)
+    with open(CLASS_THRESHOLDS_PATH, 'w') as f:
+        json.dump(thresholds, f, indent=2)
+    print(f"Class thresholds saved to {CLASS_THRESHOLDS_PATH}")
+
+    # Log waktu training (wall-clock dan per epoch)
+    val_losses = history.history.get('val_loss', [])
+    training_log = {
+        'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'architecture': model.name,
+        'warm_start': warm_started,
+        'classes': len(class_names),
+        'samples': int(len(y)),
+        'max_epochs': epochs,
+        'resumed_from_epoch': int(history.epoch[0]) if history.epoch else 0,
+        'epochs_run': len(history.epoch),
+        'stopped_early': len(history.epoch) > 0 and history.epoch[-1] + 1 < epochs,
+        'best_val_loss': float(min(val_losses)) if val_losses else None,
+        'wall_seconds': round(elapsed, 3),
+        'epochs': timer.epochs,
+    }
+    with open(TRAINING_LOG_PATH, 'w') as f:
+        json.dump(training_log, f, indent=2)
 
+    per_epoch = elapsed / len(timer.epochs) if timer.epochs else 0.0
+    print(f"Training took {elapsed:.1f}s over {len(timer.epochs)} epochs ({per_epoch:.1f}s/epoch)"
+          f"{', warm start' if warm_started else ''}")
     print("Model saved successfully!")
 
     return model, history
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the face recognition CNN")
+    parser.add_argument('--cold', action='store_true', help="Train from scratch instead of warm-starting")
+    parser.add_argument('--epochs', type=int, default=TRAIN_EPOCHS)
+    parser.add_argument('--patience', type=int, default=EARLY_STOPPING_PATIENCE)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--augment', action='store_true')
+    parser.add_argument('--no-resume', action='store_true', help="Ignore checkpoints of an interrupted run")
+    args = parser.parse_args()
+    model, _ = train_model(batch_size=args.batch_size, augment=args.augment, warm_start=not args.cold,
+                           epochs=args.epochs, patience=args.patience, resume=not args.no_resume)
+    if model is not None:
+        from .model_registry import publish_model
+        publish_model(model)
\ No newline at end of file
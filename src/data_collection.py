@@ -1,51 +1,166 @@
 import cv2
 import os
-from datetime import datetime
+import queue
+import sys
+import threading
+import time
+import numpy as np
 
-def collect_student_data(student_name, num_photos=50):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import CAPTURE_SIZE, CAPTURE_INTERVAL, CAPTURE_HASH_DISTANCE
+from .face_detector import create_detector
+from .frame_source import open_source
+from .preprocessing_data import IMAGE_EXTENSIONS
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash of an image (robust to small shifts/brightness changes)"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+class ImageWriter:
+    """Background thread that encodes and writes captured images off the UI loop"""
+    def __init__(self, max_pending=64):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, path, image):
+        self.queue.put((path, image))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, image = item
+            try:
+                ok, encoded = cv2.imencode(os.path.splitext(path)[1], image)
+                if not ok:
+                    raise ValueError("encoding failed")
+                with open(path, 'wb') as f:
+                    f.write(encoded.tobytes())
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error saving {path}: {e}")
+
+    def close(self):
+        """Wait until every queued image is on disk"""
+        self.queue.put(None)
+        self._thread.join()
+
+def crop_face(frame, box, size=CAPTURE_SIZE):
+    """Face crop resized to the training resolution (same crop as at recognition time)"""
+    x, y, w, h = box
+    frame_h, frame_w = frame.shape[:2]
+    x1, y1 = max(int(x), 0), max(int(y), 0)
+    x2, y2 = min(int(x + w), frame_w), min(int(y + h), frame_h)
+    return cv2.resize(frame[y1:y2, x1:x2], size, interpolation=cv2.INTER_AREA)
+
+def _existing_hashes(student_folder):
+    """Hashes of photos already collected, so a re-run does not add duplicates"""
+    hashes = []
+    for img_file in sorted(os.listdir(student_folder)):
+        if img_file.lower().endswith(IMAGE_EXTENSIONS):
+            img = cv2.imread(os.path.join(student_folder, img_file))
+            if img is not None:
+                hashes.append(dhash(img))
+    return hashes
+
+def _next_index(student_folder, student_name):
+    """Number after the highest existing <name>_NNN suffix (gaps from deleted photos are not reused)"""
+    prefix = f"{student_name}_"
+    indices = [int(stem[len(prefix):]) for stem, _ in map(os.path.splitext, os.listdir(student_folder))
+               if stem.startswith(prefix) and stem[len(prefix):].isdigit()]
+    return max(indices) + 1 if indices else 0
+
+def collect_student_data(student_name, num_photos=50, auto=True, source=0,
+                         min_interval=CAPTURE_INTERVAL, hash_distance=CAPTURE_HASH_DISTANCE):
     # Create directory for the student if it doesn't exist
     student_folder = f"data/students/{student_name}"
     if not os.path.exists(student_folder):
         os.makedirs(student_folder)
 
     # Initialize webcam
-    cap = cv2.VideoCapture(0)
+    cap = open_source(source)
+    detector = create_detector()
+    writer = ImageWriter()
     count = 0
+    skipped = 0
+    hashes = _existing_hashes(student_folder)
+    # Nomor file lanjut dari nomor tertinggi yang sudah ada (tidak menimpa hasil sebelumnya)
+    first_index = _next_index(student_folder, student_name)
+    last_capture = 0.0
 
     print(f"Collecting photos for {student_name}")
-    print("Press SPACE to capture photo, ESC to exit")
+    if auto:
+        print("Auto-capture: keep one face in view and move slightly. Press SPACE to pause/resume, ESC to exit")
+    else:
+        print("Press SPACE to capture photo, ESC to exit")
+    capturing = True
 
     while count < num_photos:
         ret, frame = cap.read()
         if not ret:
             break
 
+        faces = detector.detect(frame)
+        face = crop_face(frame, faces[0]) if len(faces) == 1 else None
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == 27:  # ESC key
+            break
+        if key == 32 and auto:  # SPACE key: pause/resume auto-capture
+            capturing = not capturing
+
+        manual = key == 32 and not auto
+        due = auto and capturing and time.perf_counter() - last_capture >= min_interval
+        if manual and face is None:
+            print("Capture skipped: exactly one face must be visible")
+        elif (manual or due) and face is not None:
+            face_hash = dhash(face)
+            if any(hamming(face_hash, other) < hash_distance for other in hashes):
+                # Hampir sama dengan foto sebelumnya -> tidak menambah informasi untuk training
+                skipped += 1
+            else:
+                # Simpan crop wajah; encoding dan tulis disk di thread writer
+                filename = f"{student_folder}/{student_name}_{first_index + count:03d}.jpg"
+                writer.submit(filename, face)
+                hashes.append(face_hash)
+                count += 1
+                last_capture = time.perf_counter()
+
         # Tampilkan frame
-        cv2.putText(frame, f"Photos: {count}/{num_photos}", (10, 30), 
+        for (x, y, w, h) in faces:
+            color = (0, 255, 0) if len(faces) == 1 else (0, 0, 255)
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+        cv2.putText(frame, f"Photos: {count}/{num_photos}", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, f"Student: {student_name}", (10, 70), 
+        cv2.putText(frame, f"Student: {student_name}", (10, 70),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, "Press 'SPACE' to capture photo, 'ESC' to exit", (10, 470), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        if auto:
+            hint = "Auto-capture" if capturing else "Paused"
+            cv2.putText(frame, f"{hint} - 'SPACE' pause/resume, 'ESC' exit", (10, 470),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        else:
+            cv2.putText(frame, "Press 'SPACE' to capture photo, 'ESC' to exit", (10, 470),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         cv2.imshow('Data Collection', frame)
-        
-        key = cv2.waitKey(1) & 0xFF
-        
-        if key == 32:  # SPACE key
-            # Simpan foto
-            filename = f"{student_folder}/{student_name}_{count:03d}.jpg"
-            cv2.imwrite(filename, frame)
-            count += 1
-            print(f"Saved: {filename}")
-            
-        elif key == 27:  # ESC key
-            break
 
     # Release the webcam and close windows
     cap.release()
     cv2.destroyAllWindows()
-    print(f"Collected {count} samples for {student_name})")
+    writer.close()
+    print(f"Collected {writer.written} samples for {student_name} ({skipped} near-duplicates skipped)")
+    return writer.written
 
 if __name__ == "__main__":
     student_name = input("Enter student name: ")
-    collect_student_data(student_name)
\ No newline at end of file
+    collect_student_data(student_name)
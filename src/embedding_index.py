@@ -0,0 +1,124 @@
+import os
+import numpy as np
+
+def normalize_embeddings(embeddings):
+    """L2-normalize rows so that dot product equals cosine similarity"""
+    embeddings = np.asarray(embeddings, dtype='float32')
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+class EmbeddingIndex:
+    """Centroid-per-student index searched with one vectorized matrix product"""
+    def __init__(self, dim=None, capacity=64, model_signature=None):
+        self.dim = dim
+        self.model_signature = model_signature  # sha256 file model yang menghasilkan embedding
+        self.names = []
+        self._positions = {}  # name -> baris di matrix
+        self._counts = np.zeros(capacity, dtype='int64')
+        self._vectors = np.zeros((capacity, dim), dtype='float32') if dim else None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def vectors(self):
+        return self._vectors[:len(self.names)] if self._vectors is not None else np.zeros((0, 0), 'float32')
+
+    def _ensure_capacity(self, size):
+        if self._vectors is None:
+            self._vectors = np.zeros((max(size, 64), self.dim), dtype='float32')
+            self._counts = np.zeros(len(self._vectors), dtype='int64')
+        elif size > len(self._vectors):
+            capacity = len(self._vectors)
+            while capacity < size:
+                capacity *= 2
+            vectors = np.zeros((capacity, self.dim), dtype='float32')
+            vectors[:len(self.names)] = self.vectors
+            counts = np.zeros(capacity, dtype='int64')
+            counts[:len(self.names)] = self._counts[:len(self.names)]
+            self._vectors, self._counts = vectors, counts
+
+    def add(self, name, embeddings):
+        """Insert or update a student's centroid from one or more embeddings"""
+        embeddings = normalize_embeddings(np.atleast_2d(embeddings))
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match index ({self.dim})")
+
+        position = self._positions.get(name)
+        if position is None:
+            position = len(self.names)
+            self._ensure_capacity(position + 1)
+            self.names.append(name)
+            self._positions[name] = position
+            self._counts[position] = 0
+            self._vectors[position] = 0
+
+        # Running mean dari centroid lama dan embedding baru
+        count = self._counts[position]
+        total = self._vectors[position] * count + embeddings.sum(axis=0)
+        self._counts[position] = count + len(embeddings)
+        self._vectors[position] = normalize_embeddings(total / self._counts[position])
+
+    def remove(self, name):
+        position = self._positions.pop(name, None)
+        if position is None:
+            return False
+
+        last = len(self.names) - 1
+        if position != last:
+            # Pindahkan baris terakhir ke posisi yang kosong
+            moved = self.names[last]
+            self._vectors[position] = self._vectors[last]
+            self._counts[position] = self._counts[last]
+            self.names[position] = moved
+            self._positions[moved] = position
+        self.names.pop()
+        return True
+
+    def scores(self, queries):
+        """Cosine similarity of every query against every enrolled student"""
+        queries = normalize_embeddings(np.atleast_2d(queries))
+        if not self.names:
+            return np.zeros((len(queries), 0), dtype='float32')
+        return queries @ self.vectors.T
+
+    def search(self, queries):
+        """Nearest student per query; returns (names, similarities)"""
+        if not self.names:
+            count = len(np.atleast_2d(queries))
+            return np.full(count, "Unknown", dtype=object), np.zeros(count, dtype='float32')
+
+        similarities = self.scores(queries)
+        best = np.argmax(similarities, axis=1)
+        names = np.asarray(self.names, dtype=object)[best]
+        return names, similarities[np.arange(len(best)), best]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, names=np.asarray(self.names, dtype=str),
+                 vectors=self.vectors, counts=self._counts[:len(self.names)],
+                 model_signature=np.asarray(self.model_signature or ''), dim=np.asarray(self.dim or 0))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, model_signature=None, dim=None):
+        """Load an index; raises ValueError if it was built by another model or embedding size"""
+        data = np.load(path)
+        saved_signature = str(data['model_signature']) if 'model_signature' in data.files else ''
+        if model_signature and saved_signature != model_signature:
+            raise ValueError(f"Embedding index {path} was built with a different model")
+        vectors = data['vectors']
+        saved_dim = vectors.shape[1] if vectors.size else int(data['dim']) if 'dim' in data.files else 0
+        if dim and saved_dim and saved_dim != dim:
+            raise ValueError(f"Embedding index {path} has dimension {saved_dim}, model produces {dim}")
+
+        index = cls(dim=saved_dim or dim, capacity=max(64, len(vectors)), model_signature=saved_signature or None)
+        if vectors.size:
+            index._vectors[:len(vectors)] = vectors
+            index._counts[:len(vectors)] = data['counts']
+            index.names = [str(name) for name in data['names']]
+            index._positions = {name: i for i, name in enumerate(index.names)}
+        return index
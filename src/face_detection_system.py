@@ -1,51 +1,264 @@
 import cv2
+import json
 import numpy as np
-import tensorflow as tf
 import pickle
+import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (
+    RECOGNITION_MODE, CONFIDENCE_THRESHOLD, SIMILARITY_THRESHOLD,
+    MODEL_PATH, LABEL_ENCODER_PATH, EMBEDDING_INDEX_PATH, CLASS_THRESHOLDS_PATH, INFERENCE_BACKEND,
+    MODEL_REGISTRY_DIR, IMG_SIZE
+)
+from .embedding_index import EmbeddingIndex
+from .face_detector import create_detector
+from .face_preprocessor import FacePreprocessor
+from .metrics import metrics
+from .inference_backend import KerasBackend, load_backend, model_input_dtype
+from .model_registry import file_sha256, current_version, load_manifest, verify_version, version_dir
+from .preprocessing_data import IMAGE_EXTENSIONS
+
 class FaceRecognitionSystem:
-    def __init__(self):
-        self.model = tf.keras.models.load_model('data/models/face_recognition_model.h5')
+    def __init__(self, mode=None, backend=None, version=None, registry_dir=MODEL_REGISTRY_DIR, detector=None):
+        self.mode = mode or RECOGNITION_MODE
+
+        # Versi aktif dari registry (model + kelas + parameter preprocessing), atau file kerja lama
+        self.version = version or current_version(registry_dir)
+        if self.version:
+            if not verify_version(self.version, registry_dir):
+                raise ValueError(f"Model version {self.version} failed checksum verification")
+            model_dir = version_dir(self.version, registry_dir)
+            manifest = load_manifest(self.version, registry_dir)
+            self.classes = np.asarray(manifest['classes'], dtype=object)
+            self.img_size = tuple(manifest['preprocessing']['img_size'])
+            self.model_signature = manifest['files'].get(os.path.basename(MODEL_PATH))
+        else:
+            model_dir = None
+            with open(LABEL_ENCODER_PATH, 'rb') as f:
+                self.classes = pickle.load(f).classes_
+            self.img_size = tuple(IMG_SIZE)
+            self.model_signature = None  # dihitung saat mode embedding dipakai
+        self.model_path = os.path.join(model_dir, os.path.basename(MODEL_PATH)) if model_dir else MODEL_PATH
+        thresholds_path = os.path.join(model_dir, os.path.basename(CLASS_THRESHOLDS_PATH)) if model_dir else CLASS_THRESHOLDS_PATH
+        # Index embedding yang dipublish bersama versi ini (read-only): centroid selalu dari jaringan
+        # versi ini, juga setelah hot-swap/rollback. Enroll menulis ke index kerja EMBEDDING_INDEX_PATH
+        index_name = os.path.basename(EMBEDDING_INDEX_PATH)
+        self.published_index_path = (os.path.join(model_dir, index_name)
+                                     if model_dir and index_name in manifest['files'] else None)
 
-        with open('data/models/label_encoder.pkl', 'rb') as f:
-            self.label_encoder = pickle.load(f)
+        # Runtime inference (Keras/TFLite/ONNX); 'auto' memilih yang tercepat
+        self.backend = load_backend(backend or INFERENCE_BACKEND, model_dir=model_dir)
+        self._model = None
         
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+        # Detektor wajah (Haar/YuNet/SSD) di frame yang diperkecil, dengan pencarian ROI antar frame
+        # (saat hot-reload detektor yang sedang berjalan dipakai ulang)
+        self.detector = detector or create_detector()
         
-        self.img_size = (160, 160)
-        self.confidence_threshold = 0.7
+        self.confidence_threshold = CONFIDENCE_THRESHOLD
+        self.similarity_threshold = SIMILARITY_THRESHOLD
+        self.class_thresholds = self.load_class_thresholds(thresholds_path)
+
+        # Mode embedding: nearest-neighbor ke centroid siswa, enroll tanpa retrain
+        self.embedding_model = None
+        self.embedding_index = None
+        if self.mode == 'embedding':
+            self._init_embedding()
+
+        # Buffer batch yang dipakai ulang antar frame; uint8 jika normalisasi ada di model (Rescaling)
+        self.input_dtype = model_input_dtype(self.model) if self.mode == 'embedding' else self.backend.input_dtype
+        self.preprocessor = FacePreprocessor(self.img_size, dtype=self.input_dtype)
     
-    def preprocess_face(self, face_img):
-        face_img = cv2.resize(face_img, self.img_size)
-        face_img = face_img.astype('float32') / 255.0
-        face_img = np.expand_dims(face_img, axis=0)
-        return face_img
+    @property
+    def model(self):
+        """Keras model, loaded on first use when another backend is active"""
+        if self._model is None:
+            if isinstance(self.backend, KerasBackend):
+                self._model = self.backend.model
+            else:
+                self._model = KerasBackend(self.model_path).model
+        return self._model
+
+    def _init_embedding(self):
+        """Build the embedding model and load the enrolled-student index"""
+        if self.embedding_model is None:
+            from .create_cnn_model import build_embedding_model
+            self.embedding_model = build_embedding_model(self.model)
+        if self.embedding_index is None:
+            self.embedding_index = self._load_embedding_index(int(self.embedding_model.output_shape[-1]))
+
+    def _load_embedding_index(self, dim):
+        """Load the index only if it was built by this exact model, else start empty"""
+        if self.model_signature is None:
+            self.model_signature = file_sha256(self.model_path)
+        # Index yang dipublish bersama versi; tanpa itu index kerja (signature tetap dicek)
+        path = EMBEDDING_INDEX_PATH
+        if self.published_index_path and os.path.exists(self.published_index_path):
+            path = self.published_index_path
+        if os.path.exists(path):
+            try:
+                return EmbeddingIndex.load(path, self.model_signature, dim)
+            except ValueError as e:
+                # Centroid dari model lama tidak sebanding dengan embedding model baru
+                print(f"Warning: {e}. Re-enroll all students (menu option 7) to rebuild it.")
+        return EmbeddingIndex(dim=dim, model_signature=self.model_signature)
+
+    def preprocess_face(self, face_img, rgb=True):
+        """Preprocess a single face crop (whole image is the ROI)
+
+        face_img is RGB by default, as in the original single-face API; pass
+        rgb=False for a BGR crop straight from OpenCV (frame/cv2.imread).
+        """
+        if rgb:
+            # FacePreprocessor mengharapkan BGR (frame kamera) dan menukar kanal sendiri
+            face_img = cv2.cvtColor(face_img, cv2.COLOR_RGB2BGR)
+        return self.preprocess_faces(face_img, [(0, 0, face_img.shape[1], face_img.shape[0])])
+
+    def _get_batch_buffer(self, num_faces):
+        """Get preallocated batch buffer with room for num_faces"""
+        return self.preprocessor.buffer(num_faces)
+
+    def preprocess_faces(self, frame, boxes, out=None):
+        """Crop, resize and convert every face ROI of a BGR frame into one reused batch buffer"""
+        with metrics.timer('preprocess'):
+            return self.preprocessor(frame, boxes, out=out)
+
+    def load_class_thresholds(self, path=CLASS_THRESHOLDS_PATH):
+        """Per-class softmax thresholds calibrated in train_model (default: CONFIDENCE_THRESHOLD)"""
+        thresholds = np.full(len(self.classes), self.confidence_threshold, dtype='float32')
+        if os.path.exists(path):
+            with open(path) as f:
+                calibrated = json.load(f)
+            for i, name in enumerate(self.classes):
+                thresholds[i] = calibrated.get(str(name), self.confidence_threshold)
+        return thresholds
+
+    @property
+    def class_names(self):
+        """Class name per score column"""
+        if self.mode == 'embedding':
+            return np.asarray(self.embedding_index.names, dtype=object)
+        return self.classes
+
+    @property
+    def thresholds(self):
+        """Minimum score per score column for a face to count as that student"""
+        if self.mode == 'embedding':
+            return np.full(len(self.embedding_index), self.similarity_threshold, dtype='float32')
+        return self.class_thresholds
+
+    def score_batch(self, batch):
+        """Per-class scores for a preprocessed batch: softmax probabilities or cosine similarities"""
+        if len(batch) == 0:
+            return np.empty((0, len(self.class_names)), dtype='float32')
+
+        with metrics.timer('predict'):
+            if self.mode == 'embedding':
+                embeddings = self.embedding_model.predict_on_batch(batch)
+                scores = self.embedding_index.scores(embeddings)
+            else:
+                scores = self.backend.predict(batch)
+
+        metrics.inc('faces_classified_total', len(batch))
+        return np.asarray(scores, dtype='float32')
+
+    def warm_up(self, batch_sizes=(1, 4)):
+        """Run dummy batches so the first real frame does not pay for lazy initialisation"""
+        for batch_size in batch_sizes:
+            self.score_batch(np.zeros((batch_size, self.img_size[1], self.img_size[0], 3), dtype=self.input_dtype))
+
+    def classify_batch(self, batch):
+        """Run a single forward pass over a preprocessed batch"""
+        scores = self.score_batch(batch)
+        if scores.shape[1] == 0:
+            # Index embedding masih kosong
+            return np.full(len(batch), "Unknown", dtype=object), np.zeros(len(batch), dtype='float32')
+
+        predicted_classes = np.argmax(scores, axis=1)
+        confidences = scores[np.arange(len(scores)), predicted_classes]
+        names = self.class_names[predicted_classes].astype(object)
+        unknown = confidences <= self.thresholds[predicted_classes]
+        names[unknown] = "Unknown"
+
+        metrics.inc('unknown_faces_total', int(np.count_nonzero(unknown)))
+        return names, confidences
     
-    def predict_face(self, face_img):
-        processed_face = self.preprocess_face(face_img)
-        predictions = self.model.predict(processed_face, verbose=0)
-        
-        confidence = np.max(predictions)
-        predicted_class = np.argmax(predictions)
-        
-        if confidence > self.confidence_threshold:
-            student_name = self.label_encoder.inverse_transform([predicted_class])[0]
-            return student_name, confidence
-        else:
-            return "Unknown", confidence
+    def predict_face(self, face_img, rgb=True):
+        """Predict one face crop (RGB by default, rgb=False for BGR); returns (name, confidence)"""
+        processed_face = self.preprocess_face(face_img, rgb=rgb)
+        names, confidences = self.classify_batch(processed_face)
+        return names[0], confidences[0]
+
+    def predict_faces(self, frame, boxes):
+        """Predict all detected faces in a BGR frame with one model call"""
+        batch = self.preprocess_faces(frame, boxes)
+        return self.classify_batch(batch)
+
+    def predict_scores(self, frame, boxes):
+        """Per-class score vectors for all detected faces (used by the tracker's smoothing)"""
+        return self.score_batch(self.preprocess_faces(frame, boxes))
     
-    def detect_faces(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-        return faces
+    def enroll_student(self, student_name, data_dir="data/students", batch_size=32):
+        """Add a student to the embedding index from their photos (no retraining)"""
+        self._init_embedding()
+
+        student_path = os.path.join(data_dir, student_name)
+        if not os.path.isdir(student_path):
+            print(f"Error: Folder {student_path} tidak ditemukan!")
+            return False
+
+        embeddings = []
+        batch = np.empty((batch_size, self.img_size[1], self.img_size[0], 3), dtype=model_input_dtype(self.model))
+        count = 0
+        for img_file in sorted(os.listdir(student_path)):
+            if not img_file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = cv2.imread(os.path.join(student_path, img_file))
+            if img is None:
+                continue
+
+            # Pakai wajah terbesar (sama seperti saat absensi), atau seluruh foto jika tidak terdeteksi
+            faces = self.detect_faces(img, use_roi=False)
+            if len(faces):
+                box = max(faces, key=lambda face: face[2] * face[3])
+            else:
+                box = (0, 0, img.shape[1], img.shape[0])
+            self.preprocess_faces(img, [box], out=batch[count:count + 1])
+            count += 1
+
+            if count == batch_size:
+                embeddings.append(self.embedding_model.predict_on_batch(batch))
+                count = 0
+        if count:
+            embeddings.append(self.embedding_model.predict_on_batch(batch[:count]))
+
+        if not embeddings:
+            print(f"Error: Tidak ada foto yang bisa dibaca untuk {student_name}!")
+            return False
+
+        # Enroll ulang mengganti centroid lama (foto yang sama tidak dihitung dua kali)
+        embeddings = np.concatenate(embeddings)
+        self.embedding_index.remove(student_name)
+        self.embedding_index.add(student_name, embeddings)
+        # Versi registry tidak diubah; publish_embedding_index membuat versi baru dengan index ini
+        self.embedding_index.save(EMBEDDING_INDEX_PATH)
+        print(f"Enrolled {student_name} from {len(embeddings)} photos ({len(self.embedding_index)} students in index)")
+        return True
+
+    def detect_faces(self, frame, use_roi=True):
+        # use_roi=False untuk foto yang tidak berurutan (enroll), agar tiap foto di-scan penuh
+        return self.detector.detect(frame, use_roi=use_roi)
 
 if __name__ == "__main__":
+    from .frame_source import open_source
+
+    # Argumen: sumber video (index kamera, file video, folder gambar, synthetic) dan --headless
+    args = [arg for arg in sys.argv[1:] if arg != '--headless']
+    headless = '--headless' in sys.argv[1:]
     system = FaceRecognitionSystem()
     
-    cap = cv2.VideoCapture(0)
+    cap = open_source(args[0] if args else 0)
     
     while True:
         ret, frame = cap.read()
@@ -53,14 +266,13 @@ if __name__ == "__main__":
             break
         
         faces = system.detect_faces(frame)
+        names, confidences = system.predict_faces(frame, faces)
         
-        for (x, y, w, h) in faces:
-            # Extract face
-            face_roi = frame[y:y+h, x:x+w]
-            face_rgb = cv2.cvtColor(face_roi, cv2.COLOR_BGR2RGB)
-            
-            name, confidence = system.predict_face(face_rgb)
-            
+        if headless:
+            print(", ".join(f"{name} ({confidence:.2f})" for name, confidence in zip(names, confidences)))
+            continue
+
+        for (x, y, w, h), name, confidence in zip(faces, names, confidences):
             color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
             cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
             cv2.putText(frame, f"{name} ({confidence:.2f})", 
@@ -72,4 +284,5 @@ if __name__ == "__main__":
             break
     
     cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    if not headless:
+        cv2.destroyAllWindows()
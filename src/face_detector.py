@@ -0,0 +1,208 @@
+import os
+import sys
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (
+    FACE_DETECTOR, DETECTION_SCALE, MIN_FACE_SIZE, MAX_FACE_SIZE, DETECTION_ROI, DETECTION_MOTION,
+    FULL_SCAN_EVERY, YUNET_MODEL_PATH, SSD_PROTOTXT_PATH, SSD_MODEL_PATH
+)
+from .face_tracker import iou_matrix
+from .metrics import metrics
+
+NO_FACES = np.empty((0, 4), dtype='int32')
+
+def suppress_overlaps(boxes, iou_threshold=0.3):
+    """Drop boxes that overlap a larger box (duplicates from overlapping ROIs)"""
+    if len(boxes) < 2:
+        return boxes
+    boxes = boxes[np.argsort(-(boxes[:, 2] * boxes[:, 3]))]
+    overlaps = iou_matrix(boxes, boxes)
+    keep = []
+    for i in range(len(boxes)):
+        if all(overlaps[i, j] < iou_threshold for j in keep):
+            keep.append(i)
+    return boxes[keep]
+
+class FaceDetector:
+    """Downscaled detection with ROI/motion search around previous detections"""
+    def __init__(self, scale=DETECTION_SCALE, min_face_size=MIN_FACE_SIZE, max_face_size=MAX_FACE_SIZE,
+                 use_roi=DETECTION_ROI, use_motion=DETECTION_MOTION, full_scan_every=FULL_SCAN_EVERY,
+                 roi_margin=0.5, motion_threshold=25):
+        self.scale = scale
+        self.min_face_size = min_face_size
+        self.max_face_size = max_face_size
+        self.use_roi = use_roi
+        self.use_motion = use_motion
+        self.full_scan_every = max(1, full_scan_every)
+        self.roi_margin = roi_margin
+        self.motion_threshold = motion_threshold
+
+        self._previous = NO_FACES  # box di koordinat frame kecil
+        self._previous_gray = None
+        self._frame_count = 0
+
+    def _prepare(self, frame):
+        """Downscaled image the detector runs on"""
+        raise NotImplementedError
+
+    def _detect_in(self, image):
+        """Detect faces in an already prepared image; returns (x, y, w, h) rows"""
+        raise NotImplementedError
+
+    def _to_gray(self, image):
+        return image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    def _resize(self, image):
+        if self.scale == 1.0:
+            return image
+        return cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def _expand(self, box, shape):
+        x, y, w, h = box
+        margin_w, margin_h = int(w * self.roi_margin), int(h * self.roi_margin)
+        x1, y1 = max(0, x - margin_w), max(0, y - margin_h)
+        x2, y2 = min(shape[1], x + w + margin_w), min(shape[0], y + h + margin_h)
+        return x1, y1, x2 - x1, y2 - y1
+
+    def _motion_regions(self, gray):
+        if self._previous_gray is None or self._previous_gray.shape != gray.shape:
+            return []
+        diff = cv2.absdiff(gray, self._previous_gray)
+        _, mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_side = self.min_face_size * self.scale
+        return [cv2.boundingRect(contour) for contour in contours
+                if min(cv2.boundingRect(contour)[2:]) >= min_side]
+
+    def _search_regions(self, image):
+        regions = [self._expand(box, image.shape) for box in self._previous]
+        if self.use_motion:
+            regions += [self._expand(region, image.shape) for region in self._motion_regions(self._to_gray(image))]
+        return regions
+
+    def _filter_size(self, boxes):
+        sizes = np.minimum(boxes[:, 2], boxes[:, 3])
+        keep = sizes >= self.min_face_size
+        if self.max_face_size:
+            keep &= sizes <= self.max_face_size
+        return boxes[keep]
+
+    def detect(self, frame, use_roi=True):
+        """Detect faces; with use_roi=False every call is an independent full scan"""
+        with metrics.timer('detect'):
+            boxes = self._detect(frame, use_roi)
+        metrics.inc('faces_detected_total', len(boxes))
+        return boxes
+
+    def _detect(self, frame, use_roi):
+        image = self._prepare(frame)
+
+        roi_frame = use_roi and self.use_roi and len(self._previous) and self._frame_count % self.full_scan_every
+        if roi_frame:
+            found = []
+            for x, y, w, h in self._search_regions(image):
+                boxes = self._detect_in(image[y:y+h, x:x+w])
+                if len(boxes):
+                    found.append(boxes + np.array([x, y, 0, 0]))
+            boxes = suppress_overlaps(np.concatenate(found)) if found else NO_FACES
+        else:
+            boxes = self._detect_in(image)
+
+        if use_roi:
+            self._frame_count += 1
+            if roi_frame and not len(boxes):
+                # Wajah hilang dari ROI -> frame berikutnya scan penuh
+                self._frame_count = 0
+            self._previous = boxes
+            if self.use_motion:
+                self._previous_gray = self._to_gray(image)
+
+        if not len(boxes):
+            return NO_FACES
+        return self._filter_size(np.round(np.asarray(boxes) / self.scale).astype('int32'))
+
+class HaarFaceDetector(FaceDetector):
+    def __init__(self, scale_factor=1.1, min_neighbors=4, **kwargs):
+        super().__init__(**kwargs)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+
+        min_side = max(1, int(self.min_face_size * self.scale))
+        max_side = int(self.max_face_size * self.scale) if self.max_face_size else 0
+        self.min_size = (min_side, min_side)
+        self.max_size = (max_side, max_side)
+
+    def _prepare(self, frame):
+        return self._resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    def _detect_in(self, image):
+        if min(image.shape[:2]) < self.min_size[0]:
+            return NO_FACES
+        faces = self.face_cascade.detectMultiScale(image, self.scale_factor, self.min_neighbors,
+                                                   minSize=self.min_size, maxSize=self.max_size)
+        return np.asarray(faces, dtype='int32').reshape(-1, 4)
+
+class YuNetFaceDetector(FaceDetector):
+    def __init__(self, model_path=YUNET_MODEL_PATH, score_threshold=0.7, **kwargs):
+        super().__init__(**kwargs)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"YuNet model not found: {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold)
+
+    def _prepare(self, frame):
+        return self._resize(frame)
+
+    def _detect_in(self, image):
+        self.detector.setInputSize((image.shape[1], image.shape[0]))
+        _, faces = self.detector.detect(image)
+        if faces is None:
+            return NO_FACES
+        return np.round(faces[:, :4]).astype('int32')
+
+class SsdFaceDetector(FaceDetector):
+    def __init__(self, prototxt_path=SSD_PROTOTXT_PATH, model_path=SSD_MODEL_PATH,
+                 score_threshold=0.6, input_size=300, **kwargs):
+        super().__init__(**kwargs)
+        if not os.path.exists(prototxt_path) or not os.path.exists(model_path):
+            raise FileNotFoundError(f"SSD model not found: {prototxt_path}, {model_path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        self.score_threshold = score_threshold
+        self.input_size = input_size
+
+    def _prepare(self, frame):
+        return self._resize(frame)
+
+    def _detect_in(self, image):
+        h, w = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1.0, (self.input_size, self.input_size), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+        detections = detections[detections[:, 2] >= self.score_threshold]
+        if not len(detections):
+            return NO_FACES
+
+        corners = np.clip(detections[:, 3:7], 0.0, 1.0) * np.array([w, h, w, h])
+        boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+        return np.round(boxes).astype('int32')
+
+DETECTORS = {
+    'haar': HaarFaceDetector,
+    'yunet': YuNetFaceDetector,
+    'ssd': SsdFaceDetector,
+}
+
+def create_detector(kind=None, **kwargs):
+    """Create the configured face detector, falling back to Haar if DNN model files are missing"""
+    kind = kind or FACE_DETECTOR
+    try:
+        return DETECTORS[kind](**kwargs)
+    except FileNotFoundError as e:
+        print(f"Warning: {e}. Falling back to Haar cascade.")
+        return HaarFaceDetector(**kwargs)
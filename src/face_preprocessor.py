@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+class FacePreprocessor:
+    """Crop/resize/RGB faces into preallocated batch buffers without per-face temporaries
+
+    Each face is resized straight from the BGR ROI view into its slot of a uint8
+    batch (cv2 dst=), then converted to RGB in place on the small image. Models
+    with the normalization folded in (Rescaling, uint8 input) get that batch
+    as-is; legacy float models get one in-place multiply into a float32 buffer.
+    """
+    def __init__(self, img_size=(160, 160), dtype='float32', capacity=8):
+        self.img_size = tuple(img_size)
+        self.dtype = np.dtype(dtype)
+        self._pixels = self._allocate(capacity, np.uint8)
+        self._output = self._allocate(capacity, self.dtype) if self.dtype != np.uint8 else self._pixels
+
+    def _allocate(self, capacity, dtype):
+        return np.empty((capacity, self.img_size[1], self.img_size[0], 3), dtype=dtype)
+
+    @property
+    def capacity(self):
+        return len(self._pixels)
+
+    def buffer(self, num_faces):
+        """Output-dtype batch buffer with room for num_faces (grown by doubling)"""
+        if num_faces > self.capacity:
+            capacity = self.capacity
+            while capacity < num_faces:
+                capacity *= 2
+            self._pixels = self._allocate(capacity, np.uint8)
+            self._output = self._allocate(capacity, self.dtype) if self.dtype != np.uint8 else self._pixels
+        return self._output
+
+    def __call__(self, frame, boxes, out=None):
+        """Preprocess every face in boxes; returns a view of the first len(boxes) rows"""
+        count = len(boxes)
+        self.buffer(count)
+        output = self._output if out is None else out
+        # Output uint8 ditulis langsung ke buffer tujuan, float32 lewat buffer piksel internal
+        pixels = output if output.dtype == np.uint8 else self._pixels
+
+        frame_h, frame_w = frame.shape[:2]
+        for i, (x, y, w, h) in enumerate(boxes):
+            x1, y1 = max(int(x), 0), max(int(y), 0)
+            x2, y2 = min(int(x + w), frame_w), min(int(y + h), frame_h)
+            cv2.resize(frame[y1:y2, x1:x2], self.img_size, dst=pixels[i], interpolation=cv2.INTER_LINEAR)
+            # Konversi warna setelah resize: jauh lebih sedikit piksel, hasil identik
+            cv2.cvtColor(pixels[i], cv2.COLOR_BGR2RGB, dst=pixels[i])
+
+        if output.dtype != np.uint8:
+            np.multiply(pixels[:count], np.float32(1.0 / 255.0), out=output[:count], dtype=np.float32)
+        return output[:count]
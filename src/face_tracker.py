@@ -0,0 +1,210 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import SMOOTHING_ALPHA, HYSTERESIS_MARGIN, DECIDE_AFTER
+from .metrics import metrics
+
+def iou_matrix(boxes_a, boxes_b):
+    """Compute IoU between every (x, y, w, h) box in boxes_a and boxes_b"""
+    a = np.asarray(boxes_a, dtype='float32').reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype='float32').reshape(-1, 4)
+
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    intersection = inter_w * inter_h
+
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.scores = None  # EMA vektor skor per kelas (softmax / similarity)
+        self.class_names = None
+        self.label = None  # index kelas saat ini, None = Unknown
+        self.streak = 0  # inferensi berturut-turut dengan label yang sama
+        self.decided = False  # identitas final, model tidak dijalankan lagi untuk track ini
+        self.hits = 1
+        self.missed = 0
+        self.frames_since_recognition = 0
+        self.recognitions = 0
+
+    @property
+    def name(self):
+        """Current smoothed identity"""
+        if self.label is None:
+            return "Unknown"
+        return str(self.class_names[self.label])
+
+    @property
+    def confidence(self):
+        """Smoothed score of the current identity (or of the best class while Unknown)"""
+        if self.scores is None or len(self.scores) == 0:
+            return 0.0
+        return float(self.scores[self.label if self.label is not None else np.argmax(self.scores)])
+
+    def reverify(self):
+        """Forget the identity so the model decides it again from scratch"""
+        self.scores, self.label, self.streak, self.recognitions = None, None, 0, 0
+        self.decided = False
+
+    def add_scores(self, scores, class_names, thresholds, alpha=SMOOTHING_ALPHA, margin=HYSTERESIS_MARGIN,
+                   decide_after=DECIDE_AFTER):
+        """Fold one prediction into the EMA and update the label with hysteresis"""
+        if self.scores is None or len(self.scores) != len(scores):
+            # Prediksi pertama (atau jumlah kelas berubah setelah enroll) -> mulai ulang
+            self.scores = np.array(scores, dtype='float32')
+            self.label = None
+        else:
+            self.scores *= 1.0 - alpha
+            self.scores += alpha * np.asarray(scores, dtype='float32')
+        self.class_names = class_names
+
+        previous = self.label
+        label = None
+        if len(self.scores):
+            best = int(np.argmax(self.scores))
+            if self.scores[best] > thresholds[best]:
+                label = best
+            elif previous is not None and self.scores[previous] > thresholds[previous] - margin:
+                # Hysteresis: identitas yang sudah ada baru dilepas di bawah threshold - margin
+                label = previous
+
+        self.streak = self.streak + 1 if label is not None and label == previous else int(label is not None)
+        self.label = label
+        if label is None:
+            # Sama seperti classify_batch: satu hitungan per wajah yang dinilai tetap Unknown
+            metrics.inc('unknown_faces_total')
+        if label is not None and self.streak >= decide_after and not self.decided:
+            self.decided = True
+            metrics.inc('tracks_decided_total')
+
+        self.frames_since_recognition = 0
+        self.recognitions += 1
+
+class FaceTracker:
+    """IoU/centroid tracker so the CNN only runs until a track's identity is decided"""
+    def __init__(self, iou_threshold=0.3, max_missed=10, unknown_recheck_every=5,
+                 alpha=SMOOTHING_ALPHA, hysteresis=HYSTERESIS_MARGIN, decide_after=DECIDE_AFTER):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed  # frame tanpa deteksi sebelum track dihapus
+        self.unknown_recheck_every = unknown_recheck_every  # track "Unknown" dicek ulang setiap N frame
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.decide_after = decide_after
+
+        self.tracks = []
+        self._next_id = 1
+
+        self.faces_seen = 0
+        self.faces_recognized = 0
+
+    def _associate(self, boxes):
+        """Greedy IoU matching, falling back to centroid distance for fast motion
+
+        Returns (matches, centroid_only): box index -> track, and the box indexes
+        matched only by the centroid fallback (no IoU overlap).
+        """
+        matches = {}
+        centroid_only = set()
+        if not self.tracks or len(boxes) == 0:
+            return matches, centroid_only
+
+        track_boxes = [track.box for track in self.tracks]
+        iou = iou_matrix(track_boxes, boxes)
+
+        t = np.asarray(track_boxes, dtype='float32')
+        d = np.asarray(boxes, dtype='float32').reshape(-1, 4)
+        t_center = t[:, :2] + t[:, 2:] / 2
+        d_center = d[:, :2] + d[:, 2:] / 2
+        distance = np.linalg.norm(t_center[:, None, :] - d_center[None, :, :], axis=2)
+        max_distance = 0.5 * np.maximum(t[:, 2:3], d[None, :, 2])
+
+        # Skor: IoU jika cukup overlap, selain itu centroid dekat masih dianggap cocok
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(distance < max_distance, 1.0 - distance / max_distance, 0.0))
+
+        while True:
+            track_idx, box_idx = np.unravel_index(np.argmax(score), score.shape)
+            if score[track_idx, box_idx] <= 0:
+                break
+            matches[int(box_idx)] = self.tracks[track_idx]
+            if score[track_idx, box_idx] < 1.0:
+                centroid_only.add(int(box_idx))
+            score[track_idx, :] = 0
+            score[:, box_idx] = 0
+
+        return matches, centroid_only
+
+    def update(self, boxes):
+        """Associate detections with tracks; returns one track per box, in order"""
+        matches, centroid_only = self._associate(boxes)
+        matched_tracks = set(id(track) for track in matches.values())
+
+        for track in self.tracks:
+            if id(track) not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        result = []
+        for i, box in enumerate(boxes):
+            track = matches.get(i)
+            if track is None:
+                track = Track(self._next_id, box)
+                self._next_id += 1
+                self.tracks.append(track)
+            else:
+                track.box = tuple(int(v) for v in box)
+                track.hits += 1
+                track.missed = 0
+                track.frames_since_recognition += 1
+                if i in centroid_only:
+                    # Tanpa overlap bisa jadi orang lain di posisi yang sama -> identitas diverifikasi ulang
+                    track.reverify()
+            result.append(track)
+
+        return result
+
+    def needs_recognition(self, track):
+        if track.decided:
+            return False
+        if track.recognitions == 0:
+            return True
+        if track.label is None:
+            return track.frames_since_recognition >= self.unknown_recheck_every
+        # Kandidat identitas: lanjut sampai decided
+        return True
+
+    def recognize(self, face_system, frame, boxes):
+        """Update tracks and run the model only on tracks that are not decided yet"""
+        tracks = self.update(boxes)
+        pending = [i for i, track in enumerate(tracks) if self.needs_recognition(track)]
+
+        if pending:
+            scores = face_system.predict_scores(frame, [boxes[i] for i in pending])
+            class_names, thresholds = face_system.class_names, face_system.thresholds
+            for i, track_scores in zip(pending, scores):
+                tracks[i].add_scores(track_scores, class_names, thresholds,
+                                     self.alpha, self.hysteresis, self.decide_after)
+
+        self.faces_seen += len(tracks)
+        self.faces_recognized += len(pending)
+        return tracks
+
+    def reset_scores(self):
+        """Forget undecided identities after a model swap (score columns may have changed)"""
+        for track in self.tracks:
+            if not track.decided:
+                track.reverify()
+
+    def inference_ratio(self):
+        """Fraction of detected faces that actually went through the model"""
+        if self.faces_seen == 0:
+            return 0.0
+        return self.faces_recognized / self.faces_seen
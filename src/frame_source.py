@@ -0,0 +1,179 @@
+import os
+import time
+import cv2
+import numpy as np
+from .metrics import metrics
+from .preprocessing_data import IMAGE_EXTENSIONS
+
+class FrameSource:
+    """Frame source with the cv2.VideoCapture read()/release() interface"""
+    def __init__(self, fps=None):
+        # fps: batasi kecepatan baca (replay seperti kamera); None = secepat mungkin
+        self.fps = fps
+        self.frames_read = 0
+        self._next_frame_at = None
+
+    def _read(self):
+        raise NotImplementedError
+
+    def read(self):
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_frame_at is not None and now < self._next_frame_at:
+                time.sleep(self._next_frame_at - now)
+            self._next_frame_at = max(now, self._next_frame_at or now) + 1.0 / self.fps
+
+        with metrics.timer('capture'):
+            ret, frame = self._read()
+        if ret:
+            self.frames_read += 1
+            metrics.inc('frames_total')
+        return ret, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+class CameraSource(FrameSource):
+    def __init__(self, index=0, **kwargs):
+        super().__init__(**kwargs)
+        self.name = f"camera:{index}"
+        self.cap = cv2.VideoCapture(index)
+
+    def _read(self):
+        return self.cap.read()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path, loop=False, max_frames=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = path
+        self.path = path
+        self.loop = loop
+        self.max_frames = max_frames
+        self.cap = cv2.VideoCapture(path)
+
+    def _read(self):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frames_read:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+class ImageDirectorySource(FrameSource):
+    """Recorded frames stored as images, read in file name order"""
+    def __init__(self, path, loop=False, max_frames=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = path
+        self.loop = loop
+        self.max_frames = max_frames
+        self.paths = [os.path.join(path, img_file) for img_file in sorted(os.listdir(path))
+                      if img_file.lower().endswith(IMAGE_EXTENSIONS)]
+        self._position = 0
+
+    def _read(self):
+        while self.max_frames is None or self.frames_read < self.max_frames:
+            if self._position >= len(self.paths):
+                if not self.loop or not self.frames_read:
+                    break
+                self._position = 0
+            frame = cv2.imread(self.paths[self._position])
+            self._position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def isOpened(self):
+        return bool(self.paths)
+
+class SyntheticSource(FrameSource):
+    """Generated frames with student photos drifting over a static background"""
+    def __init__(self, width=1280, height=720, num_frames=300, faces_dir="data/students",
+                 faces_per_frame=2, face_size=160, seed=42, **kwargs):
+        super().__init__(**kwargs)
+        self.name = f"synthetic:{width}x{height}"
+        self.width, self.height = width, height
+        self.num_frames = num_frames
+        self.face_size = face_size
+
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+        self.faces = self._load_faces(faces_dir, faces_per_frame)
+        # Posisi awal dan kecepatan (px/frame) tiap wajah
+        self.positions = rng.uniform(0, 1, (len(self.faces), 2)) * [width - face_size, height - face_size]
+        self.velocities = rng.uniform(-4, 4, (len(self.faces), 2))
+        self.frame = np.empty_like(self.background)
+
+    def _load_faces(self, faces_dir, count):
+        faces = []
+        if os.path.isdir(faces_dir):
+            for student_name in sorted(os.listdir(faces_dir)):
+                student_path = os.path.join(faces_dir, student_name)
+                if not os.path.isdir(student_path):
+                    continue
+                for img_file in sorted(os.listdir(student_path)):
+                    if img_file.lower().endswith(IMAGE_EXTENSIONS):
+                        img = cv2.imread(os.path.join(student_path, img_file))
+                        if img is not None:
+                            faces.append(cv2.resize(img, (self.face_size, self.face_size)))
+                            break
+                if len(faces) >= count:
+                    break
+        return faces
+
+    def _read(self):
+        if self.frames_read >= self.num_frames:
+            return False, None
+
+        np.copyto(self.frame, self.background)
+        limits = np.array([self.width - self.face_size, self.height - self.face_size])
+        for i, face in enumerate(self.faces):
+            self.positions[i] += self.velocities[i]
+            # Pantul di tepi frame
+            out_of_bounds = (self.positions[i] < 0) | (self.positions[i] > limits)
+            self.velocities[i][out_of_bounds] *= -1
+            self.positions[i] = np.clip(self.positions[i], 0, limits)
+            x, y = self.positions[i].astype(int)
+            self.frame[y:y + self.face_size, x:x + self.face_size] = face
+        return True, self.frame.copy()
+
+def open_source(source=0, **kwargs):
+    """Open a frame source from a camera index, video file, stream URL, image folder or 'synthetic[:WxH]'"""
+    if isinstance(source, FrameSource):
+        return source
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        kwargs.pop('loop', None)
+        kwargs.pop('max_frames', None)
+        return CameraSource(int(source), **kwargs)
+    if source.startswith('synthetic'):
+        kwargs.pop('loop', None)
+        if kwargs.get('max_frames') is not None:
+            kwargs['num_frames'] = kwargs.pop('max_frames')
+        kwargs.pop('max_frames', None)
+        if ':' in source:
+            width, height = source.split(':', 1)[1].lower().split('x')
+            kwargs.update(width=int(width), height=int(height))
+        return SyntheticSource(**kwargs)
+    if '://' in source:
+        # Stream jaringan (rtsp://, http://, ...) langsung ke cv2.VideoCapture
+        return VideoFileSource(source, **kwargs)
+    if os.path.isdir(source):
+        return ImageDirectorySource(source, **kwargs)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Video source not found: {source}")
+    return VideoFileSource(source, **kwargs)
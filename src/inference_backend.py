@@ -0,0 +1,165 @@
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (
+    MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_INT8_MODEL_PATH, ONNX_MODEL_PATH,
+    BACKEND_REPORT_PATH, INFERENCE_THREADS
+)
+
+def model_input_dtype(model):
+    """Input dtype of a Keras model (uint8 when Rescaling is folded into the model)"""
+    dtype = model.inputs[0].dtype
+    return np.dtype(getattr(dtype, 'as_numpy_dtype', dtype))
+
+class KerasBackend:
+    name = 'keras'
+
+    def __init__(self, model_path=MODEL_PATH, model=None):
+        if model is None:
+            import tensorflow as tf
+            model = tf.keras.models.load_model(model_path)
+        self.model = model
+        self.input_dtype = model_input_dtype(model)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+def _load_tflite_interpreter(model_path, num_threads):
+    """Prefer the standalone runtimes, fall back to the TensorFlow interpreter"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+class TFLiteBackend:
+    name = 'tflite'
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH, num_threads=INFERENCE_THREADS):
+        self.interpreter = _load_tflite_interpreter(model_path, num_threads or os.cpu_count())
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        # Model uint8 (Rescaling di dalam model) menerima piksel mentah; int8 terkuantisasi tetap diberi float
+        raw_input = self.input['dtype'] == np.uint8 and not self._is_quantized(self.input)
+        self.input_dtype = np.dtype(np.uint8 if raw_input else np.float32)
+
+    @staticmethod
+    def _is_quantized(details):
+        return details['dtype'] in (np.int8, np.uint8) and details['quantization'][0] != 0
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            shape = [batch_size] + list(self.input['shape'][1:])
+            self.interpreter.resize_tensor_input(self.input['index'], shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        self._resize(len(batch))
+
+        if self._is_quantized(self.input):
+            # Model int8: kuantisasi input sesuai scale/zero_point hasil kalibrasi
+            scale, zero_point = self.input['quantization']
+            info = np.iinfo(self.input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input['dtype'])
+        else:
+            batch = np.asarray(batch, dtype=self.input['dtype'])
+
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output['index'])
+
+        if self._is_quantized(self.output):
+            scale, zero_point = self.output['quantization']
+            output = (output.astype('float32') - zero_point) * scale
+        return output
+
+class TFLiteInt8Backend(TFLiteBackend):
+    name = 'tflite_int8'
+
+    def __init__(self, model_path=TFLITE_INT8_MODEL_PATH, num_threads=INFERENCE_THREADS):
+        super().__init__(model_path, num_threads)
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, model_path=ONNX_MODEL_PATH, num_threads=INFERENCE_THREADS):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        self.input_dtype = np.dtype(np.uint8 if self.session.get_inputs()[0].type == 'tensor(uint8)' else np.float32)
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: np.asarray(batch, dtype=self.input_dtype)})[0]
+
+BACKENDS = {
+    'keras': (KerasBackend, MODEL_PATH),
+    'tflite': (TFLiteBackend, TFLITE_MODEL_PATH),
+    'tflite_int8': (TFLiteInt8Backend, TFLITE_INT8_MODEL_PATH),
+    'onnx': (OnnxBackend, ONNX_MODEL_PATH),
+}
+
+# Urutan default jika belum ada laporan benchmark
+DEFAULT_PREFERENCE = ['onnx', 'tflite', 'keras']
+
+def backend_preference(report_path=BACKEND_REPORT_PATH, max_accuracy_drop=0.01):
+    """Order backends by measured latency from the comparison report"""
+    if not os.path.exists(report_path):
+        return DEFAULT_PREFERENCE
+
+    with open(report_path) as f:
+        report = json.load(f)
+
+    baseline = report.get('keras', {}).get('accuracy')
+    candidates = []
+    for name, result in report.items():
+        if name not in BACKENDS or 'batch_latency_ms' not in result:
+            continue
+        # Backend yang akurasinya turun terlalu jauh tidak dipilih otomatis
+        if baseline is not None and result.get('accuracy', 0) < baseline - max_accuracy_drop:
+            continue
+        candidates.append((result['batch_latency_ms'], name))
+
+    ordered = [name for _, name in sorted(candidates)]
+    return ordered + [name for name in DEFAULT_PREFERENCE if name not in ordered]
+
+def load_backend(preference='auto', model_dir=None):
+    """Load the requested backend, or the fastest available one for 'auto'
+
+    model_dir: folder of a registry version; files are looked up there by name.
+    """
+    def locate(path):
+        return os.path.join(model_dir, os.path.basename(path)) if model_dir else path
+
+    keras_path = locate(MODEL_PATH)
+    names = backend_preference(locate(BACKEND_REPORT_PATH)) if preference == 'auto' else [preference]
+
+    for name in names:
+        backend_class, model_path = BACKENDS[name]
+        model_path = locate(model_path)
+        if not os.path.exists(model_path):
+            continue
+        if (name != 'keras' and os.path.exists(keras_path)
+                and os.path.getmtime(model_path) < os.path.getmtime(keras_path)):
+            # File export lebih lama dari model Keras -> belum di-export ulang setelah training
+            print(f"Skipping {name}: {model_path} is older than {keras_path}")
+            continue
+        try:
+            backend = backend_class(model_path)
+            print(f"Inference backend: {name}")
+            return backend
+        except ImportError as e:
+            print(f"Backend {name} not available: {e}")
+
+    raise FileNotFoundError(f"No model found for backend(s): {', '.join(names)}")
@@ -0,0 +1,308 @@
+import bisect
+import cProfile
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.metrics import (
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_LOG_INTERVAL, METRICS_LOG_PATH, METRICS_BUCKETS,
+    PROFILER, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS
+)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in items) + '}'
+
+def _to_ms(seconds):
+    # Di atas bucket terbesar -> None (JSON tidak punya Infinity)
+    return seconds * 1000.0 if seconds != float('inf') else None
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative on export, like Prometheus)"""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound containing the q-th observation"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+class Metrics:
+    """Thread-safe counters and latency histograms for the recognition hot path"""
+    def __init__(self, enabled=METRICS_ENABLED, buckets=METRICS_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled or not amount:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block into the stage_seconds histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Counters and per-stage latency summary as plain dicts (for the JSON log)"""
+        with self._lock:
+            counters = {name + _format_labels(labels): value for (name, labels), value in self.counters.items()}
+            stages = {}
+            for (name, labels), histogram in self.histograms.items():
+                stages[name + _format_labels(labels)] = {
+                    'count': histogram.count,
+                    'avg_ms': histogram.sum / histogram.count * 1000.0 if histogram.count else 0.0,
+                    'p50_ms': _to_ms(histogram.quantile(0.50)),
+                    'p95_ms': _to_ms(histogram.quantile(0.95)),
+                    'p99_ms': _to_ms(histogram.quantile(0.99)),
+                }
+        return {'uptime_sec': time.time() - self.started_at, 'counters': counters, 'latency': stages}
+
+    def render_prometheus(self, prefix='sas_'):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{prefix}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{prefix}{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{prefix}{name}_count{_format_labels(labels)} {histogram.count}")
+        lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+        lines.append(f"{prefix}uptime_seconds {time.time() - self.started_at:.1f}")
+        return "\n".join(lines) + "\n"
+
+# Registry global proses, dipakai semua modul
+metrics = Metrics()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body = metrics.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.split('?')[0] == '/metrics.json':
+            body = json.dumps(metrics.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # jangan spam stdout per scrape
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics (Prometheus) and /metrics.json on a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+class JsonLogReporter(threading.Thread):
+    """Write one JSON line with the metrics snapshot every interval seconds"""
+    def __init__(self, interval=METRICS_LOG_INTERVAL, path=METRICS_LOG_PATH):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.path = path
+        self.stopped = threading.Event()
+
+    def write(self):
+        line = json.dumps({'timestamp': datetime.now().isoformat(timespec='seconds'), **metrics.snapshot()})
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(line + "\n")
+        else:
+            print(line, flush=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.write()
+
+class SamplingProfiler(threading.Thread):
+    """Low-overhead profiler sampling the stacks of all threads (collapsed-stack output)"""
+    def __init__(self, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        super().__init__(daemon=True)
+        self.interval = interval_ms / 1000.0
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        # Format "stack count" per baris, bisa langsung dipakai flamegraph.pl / speedscope
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Profiler:
+    """cProfile or sampling profiler that can be toggled while running"""
+    def __init__(self, kind=PROFILER, output_dir=PROFILE_DIR):
+        if kind not in ('cprofile', 'sampling'):
+            raise ValueError(f"Unknown profiler: {kind} (choose 'cprofile' or 'sampling')")
+        self.kind = kind
+        self.output_dir = output_dir
+        self._profiler = None
+
+    @property
+    def running(self):
+        return self._profiler is not None
+
+    def start(self):
+        if self.running:
+            return
+        if self.kind == 'cprofile':
+            # cProfile hanya mengukur thread yang memanggil start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        print(f"Profiler ({self.kind}) started")
+
+    def stop(self):
+        """Stop profiling and write the result; returns the output path"""
+        if not self.running:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if self.kind == 'cprofile':
+            self._profiler.disable()
+            path = os.path.join(self.output_dir, f"profile_{stamp}.prof")
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.stopped.set()
+            self._profiler.join(timeout=2)
+            path = os.path.join(self.output_dir, f"profile_{stamp}.folded")
+            self._profiler.dump(path)
+        self._profiler = None
+        print(f"Profile saved to {path}")
+        return path
+
+    def toggle(self, *_):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def install_signal_handler(self):
+        """Toggle profiling with `kill -USR1 <pid>` (Unix, main thread only)"""
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, self.toggle)
+
+class MetricsRuntime:
+    """HTTP endpoint, periodic JSON log and profiler started together and stopped together"""
+    def __init__(self, port=METRICS_PORT, log_interval=METRICS_LOG_INTERVAL, log_path=METRICS_LOG_PATH,
+                 profiler=PROFILER):
+        self.server = None
+        self.reporter = None
+        self.profiler = None
+
+        if port is not None:
+            try:
+                self.server = start_http_server(port)
+            except OSError as e:
+                print(f"Warning: metrics endpoint not started: {e}")
+        if log_interval:
+            self.reporter = JsonLogReporter(log_interval, log_path)
+            self.reporter.start()
+        if profiler:
+            self.profiler = Profiler(profiler)
+            self.profiler.install_signal_handler()
+            self.profiler.start()
+
+    def stop(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+        if self.reporter is not None:
+            self.reporter.stop()
+            self.reporter = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
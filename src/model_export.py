@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (
+    MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_INT8_MODEL_PATH, ONNX_MODEL_PATH, BACKEND_REPORT_PATH
+)
+from .inference_backend import BACKENDS, model_input_dtype
+
+def _model_inputs(X, indices, dtype):
+    """Samples in the model's input format: raw uint8 pixels or float32 in [0, 1]"""
+    batch = np.asarray(X[np.sort(indices)])
+    if np.dtype(dtype) == np.uint8:
+        if batch.dtype == np.uint8:
+            return batch
+        return np.round(np.clip(batch, 0.0, 1.0) * 255.0).astype('uint8')
+    if batch.dtype == np.uint8:
+        return batch.astype('float32') / 255.0
+    return batch.astype('float32')
+
+def _validation_split(X_path='data/training_data/X_train.npy', y_path='data/training_data/y_train.npy'):
+    """Same index split as train_model, without loading the images"""
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path)
+    _, val_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    return X, y, np.sort(val_idx)
+
+def export_tflite(model, output_path=TFLITE_MODEL_PATH, quantize=False, calibration_samples=200,
+                  X_path='data/training_data/X_train.npy'):
+    """Convert the Keras model to TFLite, optionally full-int8 calibrated on X_train.npy"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    input_dtype = model_input_dtype(model)
+
+    if quantize:
+        X = np.load(X_path, mmap_mode='r')
+        rng = np.random.default_rng(42)
+        sample = rng.choice(len(X), size=min(calibration_samples, len(X)), replace=False)
+
+        def representative_dataset():
+            for index in sample:
+                yield [_model_inputs(X, [index], input_dtype)]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Model dengan input uint8 (Rescaling di dalam model) tetap menerima piksel mentah
+        converter.inference_input_type = tf.uint8 if input_dtype == np.uint8 else tf.int8
+        converter.inference_output_type = tf.int8
+
+    tflite_model = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"TFLite model{' (int8)' if quantize else ''} saved to {output_path} "
+          f"({len(tflite_model) / 1024 / 1024:.1f} MB)")
+    return True
+
+def export_onnx(model, output_path=ONNX_MODEL_PATH, opset=13):
+    """Convert the Keras model to ONNX (needs tf2onnx)"""
+    try:
+        import tf2onnx
+    except ImportError:
+        print("Skipping ONNX export: tf2onnx is not installed")
+        return False
+
+    input_signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.as_dtype(model_input_dtype(model)),
+                                     name='input')]
+
+    # Konversi lewat tf.function agar kompatibel dengan Keras 2 maupun Keras 3
+    @tf.function(input_signature=input_signature)
+    def serve(images):
+        return model(images, training=False)
+
+    try:
+        tf2onnx.convert.from_function(serve, input_signature=input_signature, opset=opset, output_path=output_path)
+    except Exception as e:
+        print(f"Error exporting ONNX model: {e}")
+        return False
+    print(f"ONNX model saved to {output_path}")
+    return True
+
+def _measure_latency(backend, batch, repeats):
+    backend.predict(batch)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.predict(batch)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(timings))
+
+def compare_backends(num_samples=500, batch_size=16, repeats=20, report_path=BACKEND_REPORT_PATH):
+    """Accuracy/latency of every exported backend against the Keras model on the validation split"""
+    X, y, val_idx = _validation_split()
+    if len(val_idx) > num_samples:
+        # Subset acak (semua kelas terwakili), diurutkan lagi agar baca memmap tetap berurutan
+        val_idx = np.sort(np.random.default_rng(42).choice(val_idx, num_samples, replace=False))
+    y_val = y[val_idx]
+    inputs = {}  # dtype -> sampel validasi dalam format input backend
+
+    report = {}
+    keras_predictions = None
+    for name, (backend_class, model_path) in BACKENDS.items():
+        if not os.path.exists(model_path):
+            continue
+        try:
+            backend = backend_class(model_path)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        if backend.input_dtype not in inputs:
+            inputs[backend.input_dtype] = _model_inputs(X, val_idx, backend.input_dtype)
+        X_val = inputs[backend.input_dtype]
+
+        predictions = np.concatenate([backend.predict(X_val[start:start + batch_size])
+                                      for start in range(0, len(X_val), batch_size)])
+        predicted = np.argmax(predictions, axis=1)
+        if name == 'keras':
+            keras_predictions = predicted
+
+        report[name] = {
+            'accuracy': float(np.mean(predicted == y_val)),
+            'agreement_with_keras': float(np.mean(predicted == keras_predictions)) if keras_predictions is not None else None,
+            'single_latency_ms': _measure_latency(backend, X_val[:1], repeats),
+            'batch_latency_ms': _measure_latency(backend, X_val[:batch_size], repeats) / min(batch_size, len(X_val)),
+            'model_size_mb': os.path.getsize(model_path) / 1024 / 1024,
+        }
+
+    print(f"\n=== Backend Comparison ({len(val_idx)} validation samples) ===")
+    print(f"{'backend':<13}{'accuracy':>10}{'agree':>8}{'1 face':>11}{'per face@' + str(batch_size):>14}{'size':>9}")
+    for name, result in report.items():
+        agreement = result['agreement_with_keras']
+        print(f"{name:<13}{result['accuracy']:>10.3f}{(agreement if agreement is not None else float('nan')):>8.3f}"
+              f"{result['single_latency_ms']:>9.2f}ms{result['batch_latency_ms']:>12.2f}ms{result['model_size_mb']:>7.1f}MB")
+
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {report_path}")
+    return report
+
+def export_models(model=None, quantize=False, onnx=True, compare=True):
+    """Export step after train_model: TFLite (+ int8) and ONNX, then compare with Keras"""
+    if model is None:
+        model = tf.keras.models.load_model(MODEL_PATH)
+
+    export_tflite(model, TFLITE_MODEL_PATH)
+    if quantize:
+        export_tflite(model, TFLITE_INT8_MODEL_PATH, quantize=True)
+    elif os.path.exists(TFLITE_INT8_MODEL_PATH):
+        # Model int8 lama tidak cocok lagi dengan model yang baru di-train
+        os.remove(TFLITE_INT8_MODEL_PATH)
+    if onnx:
+        if not export_onnx(model) and os.path.exists(ONNX_MODEL_PATH):
+            os.remove(ONNX_MODEL_PATH)
+
+    if compare:
+        return compare_backends()
+    return None
+
+if __name__ == "__main__":
+    export_models(quantize=True)
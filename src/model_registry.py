@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import (
+    MODEL_PATH, LABEL_ENCODER_PATH, CLASS_THRESHOLDS_PATH, MODEL_CLASSES_PATH,
+    TFLITE_MODEL_PATH, TFLITE_INT8_MODEL_PATH, ONNX_MODEL_PATH, BACKEND_REPORT_PATH, EMBEDDING_INDEX_PATH,
+    MODEL_REGISTRY_DIR, MODEL_POLL_INTERVAL, MODEL_KEEP_VERSIONS
+)
+
+# File kerja hasil training/export yang ikut dipublish (nama file sama di folder versi)
+ARTIFACTS = [MODEL_PATH, TFLITE_MODEL_PATH, TFLITE_INT8_MODEL_PATH, ONNX_MODEL_PATH,
+             BACKEND_REPORT_PATH, CLASS_THRESHOLDS_PATH]
+MANIFEST = 'manifest.json'
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file (also the model signature stored in embedding indexes)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_json_atomic(path, data):
+    """Write to a temp file, fsync and rename so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _checksum(files):
+    """Single checksum over every artifact hash (order independent)"""
+    return hashlib.sha256(''.join(f"{name}:{files[name]}" for name in sorted(files)).encode()).hexdigest()
+
+def version_dir(version, registry_dir=MODEL_REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+def list_versions(registry_dir=MODEL_REGISTRY_DIR):
+    """Published versions, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if os.path.exists(os.path.join(registry_dir, name, MANIFEST)))
+
+def load_manifest(version, registry_dir=MODEL_REGISTRY_DIR):
+    with open(os.path.join(version_dir(version, registry_dir), MANIFEST)) as f:
+        return json.load(f)
+
+def verify_version(version, registry_dir=MODEL_REGISTRY_DIR):
+    """Check every artifact of a version against the checksums in its manifest"""
+    manifest = load_manifest(version, registry_dir)
+    files = {}
+    for name in manifest['files']:
+        path = os.path.join(version_dir(version, registry_dir), name)
+        if not os.path.exists(path):
+            return False
+        files[name] = file_sha256(path)
+    return files == manifest['files'] and _checksum(files) == manifest['checksum']
+
+def current_version(registry_dir=MODEL_REGISTRY_DIR):
+    """Active version (None if nothing was published yet)"""
+    try:
+        with open(os.path.join(registry_dir, 'CURRENT')) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+def _load_history(registry_dir):
+    path = os.path.join(registry_dir, 'history.json')
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def activate_version(version, registry_dir=MODEL_REGISTRY_DIR, record_history=True):
+    """Atomically point CURRENT at a published version"""
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version: {version}")
+
+    tmp_path = os.path.join(registry_dir, 'CURRENT.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(registry_dir, 'CURRENT'))
+
+    if record_history:
+        history = _load_history(registry_dir)
+        history.append(version)
+        _write_json_atomic(os.path.join(registry_dir, 'history.json'), history)
+    print(f"Active model version: {version}")
+    return version
+
+def rollback(registry_dir=MODEL_REGISTRY_DIR):
+    """Re-activate the version that was active before the current one"""
+    history = [version for version in _load_history(registry_dir) if version in list_versions(registry_dir)]
+    current = current_version(registry_dir)
+    while history and history[-1] == current:
+        history.pop()
+    if not history:
+        print("No previous model version to roll back to")
+        return None
+
+    _write_json_atomic(os.path.join(registry_dir, 'history.json'), history)
+    return activate_version(history[-1], registry_dir, record_history=False)
+
+def _prune(registry_dir, keep):
+    versions = list_versions(registry_dir)
+    current = current_version(registry_dir)
+    for version in versions[:-keep] if keep else []:
+        if version != current:
+            shutil.rmtree(version_dir(version, registry_dir), ignore_errors=True)
+
+def publish_model(model=None, classes=None, registry_dir=MODEL_REGISTRY_DIR, activate=True,
+                  keep=MODEL_KEEP_VERSIONS):
+    """Snapshot the trained model, exports and metadata into a new immutable registry version"""
+    if not os.path.exists(MODEL_PATH):
+        print(f"Error: {MODEL_PATH} not found, train the model first")
+        return None
+
+    if model is None:
+        import tensorflow as tf
+        model = tf.keras.models.load_model(MODEL_PATH, compile=False)
+    from .inference_backend import model_input_dtype
+
+    if classes is None:
+        if os.path.exists(MODEL_CLASSES_PATH):
+            with open(MODEL_CLASSES_PATH) as f:
+                classes = json.load(f)
+        else:
+            import pickle
+            with open(LABEL_ENCODER_PATH, 'rb') as f:
+                classes = pickle.load(f).classes_
+    classes = [str(name) for name in classes]
+
+    input_dtype = model_input_dtype(model)
+    height, width = model.inputs[0].shape[1:3]
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'architecture': model.name,
+        'classes': classes,
+        'preprocessing': {
+            'img_size': [int(width), int(height)],
+            'color': 'RGB',
+            'input_dtype': str(input_dtype),
+            # uint8: Rescaling(1/255) ada di dalam model; float32: piksel dibagi 255 sebelum inference
+            'normalization': 'in_model' if input_dtype.name == 'uint8' else 'divide_255',
+        },
+    }
+
+    sources = {}
+    for path in ARTIFACTS:
+        if not os.path.exists(path):
+            continue
+        if path != MODEL_PATH and os.path.getmtime(path) < os.path.getmtime(MODEL_PATH):
+            # Export/laporan lama dari model sebelumnya tidak ikut dipublish
+            continue
+        sources[os.path.basename(path)] = path
+
+    # Index embedding kerja ikut dipublish hanya jika dibuat oleh model ini (signature = sha256 file model)
+    if os.path.exists(EMBEDDING_INDEX_PATH):
+        from .embedding_index import EmbeddingIndex
+        try:
+            EmbeddingIndex.load(EMBEDDING_INDEX_PATH, file_sha256(MODEL_PATH))
+            sources[os.path.basename(EMBEDDING_INDEX_PATH)] = EMBEDDING_INDEX_PATH
+        except ValueError:
+            print("Embedding index belongs to an older model, not published (re-enroll students)")
+
+    return _write_version(manifest, sources, registry_dir, activate, keep)
+
+def publish_embedding_index(base_version=None, index_path=EMBEDDING_INDEX_PATH, registry_dir=MODEL_REGISTRY_DIR,
+                            activate=True, keep=MODEL_KEEP_VERSIONS):
+    """Publish enrolled students as a new version: base version artifacts + the working embedding index
+
+    Versions are immutable, so enrollment writes the working index and a new
+    version carries it (a running system picks it up through hot-reload).
+    """
+    base_version = base_version or current_version(registry_dir)
+    if base_version is None:
+        print("No model version to add the embedding index to, publish a model first")
+        return None
+
+    from .embedding_index import EmbeddingIndex
+    base = load_manifest(base_version, registry_dir)
+    model_name = os.path.basename(MODEL_PATH)
+    try:
+        EmbeddingIndex.load(index_path, base['files'][model_name])
+    except (ValueError, KeyError, FileNotFoundError) as e:
+        print(f"Error: embedding index does not match model version {base_version}: {e}")
+        return None
+
+    sources = {name: os.path.join(version_dir(base_version, registry_dir), name) for name in base['files']}
+    sources[os.path.basename(EMBEDDING_INDEX_PATH)] = index_path
+    manifest = {key: value for key, value in base.items() if key not in ('version', 'files', 'checksum')}
+    manifest['created_at'] = datetime.now().isoformat(timespec='seconds')
+    manifest['base_version'] = base_version
+    return _write_version(manifest, sources, registry_dir, activate, keep)
+
+def _write_version(manifest, sources, registry_dir, activate, keep):
+    """Copy sources (file name -> path) into a new immutable version with checksums"""
+    os.makedirs(registry_dir, exist_ok=True)
+    version = datetime.now().strftime('v%Y%m%d-%H%M%S')
+    while os.path.exists(version_dir(version, registry_dir)):
+        time.sleep(1)
+        version = datetime.now().strftime('v%Y%m%d-%H%M%S')
+    manifest['version'] = version
+
+    # Salin ke folder sementara, lalu rename (atomic) -> versi tidak pernah terlihat setengah jadi
+    tmp_dir = os.path.join(registry_dir, f".tmp-{version}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    files = {}
+    for name, path in sources.items():
+        shutil.copy2(path, os.path.join(tmp_dir, name))
+        files[name] = file_sha256(os.path.join(tmp_dir, name))
+    manifest['files'] = files
+    manifest['checksum'] = _checksum(files)
+    _write_json_atomic(os.path.join(tmp_dir, MANIFEST), manifest)
+    os.rename(tmp_dir, version_dir(version, registry_dir))
+
+    print(f"Published model version {version} ({len(manifest['classes'])} classes, {len(files)} files)")
+    if activate:
+        activate_version(version, registry_dir)
+    _prune(registry_dir, keep)
+    return version
+
+class ModelWatcher(threading.Thread):
+    """Load and warm up newly activated registry versions off the camera loop
+
+    The ready FaceRecognitionSystem is handed to AttendanceSystem.stage_model;
+    the frame loop swaps it in between two frames, so no frame waits for loading.
+    """
+    def __init__(self, attendance_system, registry_dir=MODEL_REGISTRY_DIR, interval=MODEL_POLL_INTERVAL):
+        super().__init__(daemon=True)
+        self.attendance_system = attendance_system
+        self.registry_dir = registry_dir
+        self.interval = interval
+        self.failed = set()  # versi yang gagal dimuat tidak dicoba terus-menerus
+        self._stop = threading.Event()
+
+    def check(self):
+        """Load the active version if it differs from the running one; returns True if staged"""
+        version = current_version(self.registry_dir)
+        if version is None or version in self.failed or version == self.attendance_system.model_version:
+            return False
+
+        from .face_detection_system import FaceRecognitionSystem
+        started = time.perf_counter()
+        try:
+            running = self.attendance_system.face_system
+            face_system = FaceRecognitionSystem(mode=running.mode, version=version, registry_dir=self.registry_dir,
+                                                detector=running.detector)
+            face_system.warm_up()
+        except Exception as e:
+            print(f"Error loading model version {version}: {e}")
+            self.failed.add(version)
+            return False
+
+        print(f"Model version {version} loaded in {time.perf_counter() - started:.1f}s, switching")
+        self.attendance_system.stage_model(face_system)
+        return True
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Versioned model registry")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="Show published versions")
+    subparsers.add_parser('publish', help="Publish the current training output as a new version")
+    subparsers.add_parser('publish-index', help="Publish the enrolled embedding index on top of the active version")
+    subparsers.add_parser('rollback', help="Re-activate the previously active version")
+    activate_parser = subparsers.add_parser('activate', help="Activate a specific version")
+    activate_parser.add_argument('version')
+    verify_parser = subparsers.add_parser('verify', help="Check artifact checksums")
+    verify_parser.add_argument('version', nargs='?')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        current = current_version()
+        for version in list_versions():
+            manifest = load_manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {manifest['created_at']}  {len(manifest['classes'])} classes  "
+                  f"{', '.join(sorted(manifest['files']))}")
+    elif args.command == 'publish':
+        publish_model()
+    elif args.command == 'publish-index':
+        publish_embedding_index()
+    elif args.command == 'rollback':
+        rollback()
+    elif args.command == 'activate':
+        activate_version(args.version)
+    else:
+        version = args.version or current_version()
+        print(f"{version}: {'OK' if version and verify_version(version) else 'CHECKSUM MISMATCH'}")
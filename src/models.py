@@ -1,18 +1,30 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date
+from sqlalchemy import create_engine, inspect, select, text, and_, or_, Column, Integer, String, DateTime, Date, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
 from datetime import datetime, date
 import sys
 import os
+import threading
 
 # Add config to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.database import DATABASE_URL
+from config.database import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
 
 Base = declarative_base()
 
 class Attendance(Base):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # Satu baris per siswa per hari; juga menjaga retry bulk insert tetap idempotent
+        UniqueConstraint('student_name', 'date', name='uq_attendance_student_date'),
+        # Query per tanggal (absensi hari ini, per tanggal, export rentang tanggal)
+        Index('ix_attendance_date_student', 'date', 'student_name'),
+        # Urutan export/backfill (date, id): keyset pagination tanpa filesort
+        Index('ix_attendance_date_id', 'date', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_name = Column(String(100), nullable=False)
@@ -24,24 +36,208 @@ class Attendance(Base):
     def __repr__(self):
         return f"<Attendance(id={self.id}, student_name='{self.student_name}', date='{self.date}', time='{self.time}')>"
 
+class DailyAttendanceSummary(Base):
+    """Per-day totals, kept up to date whenever attendance rows are inserted"""
+    __tablename__ = 'attendance_daily_summary'
+
+    date = Column(Date, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    first_arrival = Column(String(10))
+    last_arrival = Column(String(10))
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<DailyAttendanceSummary(date='{self.date}', present_count={self.present_count})>"
+
+class StudentMonthlySummary(Base):
+    """Per-student per-month totals, kept up to date whenever attendance rows are inserted"""
+    __tablename__ = 'attendance_student_monthly'
+    __table_args__ = (
+        # Laporan per periode (semua siswa dalam satu bulan/tahun)
+        Index('ix_student_monthly_period', 'year', 'month'),
+    )
+
+    student_name = Column(String(100), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    days_present = Column(Integer, nullable=False, default=0)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    arrival_seconds = Column(Integer, nullable=False, default=0)  # total jam datang (detik), untuk rata-rata
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return (f"<StudentMonthlySummary(student_name='{self.student_name}', "
+                f"period='{self.year}-{self.month:02d}', days_present={self.days_present})>")
+
 # Database connection
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def create_db_engine(url=DATABASE_URL):
+    """Create engine with the pool settings from config/database.py"""
+    options = {'echo': False}
+    if not url.startswith('sqlite'):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return create_engine(url, **options)
+
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def get_engine():
+    """Get the current engine (may be swapped by configure_database)"""
+    return engine
+
+def configure_database(url):
+    """Point the engine and sessions at another database URL (e.g. SQLite for benchmarks)"""
+    global engine, _schema_ready
+    engine.dispose()
+    engine = create_db_engine(url)
+    SessionLocal.configure(bind=engine)
+    _schema_ready = False
+    return engine
 
 def get_db_session():
     """Get database session"""
     return SessionLocal()
 
+@contextmanager
+def session_scope():
+    """Provide a session that commits on success, rolls back on error and always closes"""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def iter_attendance_pages(columns, conditions=(), page_size=5000):
+    """Yield attendance rows in (date, id) order, one keyset-paginated query per page
+
+    mysql-connector has no server-side cursors (stream_results is ignored and the
+    whole result is buffered), so large reads are split into short queries
+    WHERE date > :d OR (date = :d AND id > :i) ... LIMIT page_size, which are
+    range scans on ix_attendance_date_id (MySQL does not range-optimize row
+    constructor comparisons). The columns must include Attendance.date and Attendance.id.
+    """
+    stmt = (select(*columns).where(*conditions)
+            .order_by(Attendance.date, Attendance.id).limit(page_size))
+    last_key = None
+    with engine.connect() as conn:
+        while True:
+            page_stmt = stmt
+            if last_key is not None:
+                last_date, last_id = last_key
+                page_stmt = stmt.where(or_(Attendance.date > last_date,
+                                           and_(Attendance.date == last_date, Attendance.id > last_id)))
+            rows = conn.execute(page_stmt).all()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1].date, rows[-1].id)
+
 def create_tables():
     """Create all tables"""
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
 
-def init_database():
-    """Initialize database and create tables"""
+def init_database(force=False):
+    """Initialize database and create tables (once per process)"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready and not force:
+            return True
+        try:
+            create_tables()
+            _schema_ready = True
+            return True
+        except Exception as e:
+            print(f"Error creating database: {e}")
+            return False
+
+def has_attendance_unique_constraint():
+    """True if attendance has uq_attendance_student_date (makes INSERT IGNORE retries idempotent)"""
+    try:
+        inspector = inspect(engine)
+        names = {index['name'] for index in inspector.get_indexes('attendance') if index.get('unique')}
+        names.update(constraint['name'] for constraint in inspector.get_unique_constraints('attendance'))
+        return 'uq_attendance_student_date' in names
+    except Exception as e:
+        print(f"Error inspecting attendance table: {e}")
+        return False
+
+def find_duplicate_attendance(conn):
+    """(student_name, date, count) groups that block the unique constraint"""
+    return conn.execute(text(
+        "SELECT student_name, date, COUNT(*) FROM attendance "
+        "GROUP BY student_name, date HAVING COUNT(*) > 1 ORDER BY date, student_name"
+    )).all()
+
+def migrate_database(dedupe=False):
+    """Add the attendance indexes/unique constraint to tables created by older versions
+
+    Duplicate (student_name, date) rows block the unique constraint. They are
+    only removed with dedupe=True, after being copied to attendance_duplicates;
+    otherwise they are reported and the migration stops without changes.
+    """
     try:
-        create_tables()
+        inspector = inspect(engine)
+        if 'attendance' not in inspector.get_table_names():
+            return True
+
+        existing = {index['name'] for index in inspector.get_indexes('attendance')}
+        existing.update(constraint['name'] for constraint in inspector.get_unique_constraints('attendance'))
+
+        with engine.begin() as conn:
+            if 'uq_attendance_student_date' not in existing:
+                duplicates = find_duplicate_attendance(conn)
+                if duplicates and not dedupe:
+                    print(f"Found {len(duplicates)} (student_name, date) groups with duplicate attendance rows:")
+                    for student_name, record_date, count in duplicates[:20]:
+                        print(f"  {student_name} {record_date}: {count} rows")
+                    if len(duplicates) > 20:
+                        print(f"  ... and {len(duplicates) - 20} more")
+                    print("Unique constraint not added. Clean them up manually or re-run with --dedupe "
+                          "(keeps the first row, copies the others to attendance_duplicates).")
+                    return False
+
+                if duplicates:
+                    # Baris yang dihapus disalin dulu ke tabel samping (bisa dipulihkan)
+                    extra_rows = ("WHERE id NOT IN (SELECT keep_id FROM (SELECT MIN(id) AS keep_id "
+                                  "FROM attendance GROUP BY student_name, date) AS keep_rows)")
+                    if 'attendance_duplicates' in inspector.get_table_names():
+                        conn.execute(text(f"INSERT INTO attendance_duplicates SELECT * FROM attendance {extra_rows}"))
+                    else:
+                        conn.execute(text(f"CREATE TABLE attendance_duplicates AS SELECT * FROM attendance {extra_rows}"))
+                    result = conn.execute(text(f"DELETE FROM attendance {extra_rows}"))
+                    print(f"Moved {result.rowcount} duplicate attendance rows to attendance_duplicates")
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX uq_attendance_student_date ON attendance (student_name, date)"
+                ))
+                print("Added unique index uq_attendance_student_date")
+
+            if 'ix_attendance_date_student' not in existing:
+                conn.execute(text(
+                    "CREATE INDEX ix_attendance_date_student ON attendance (date, student_name)"
+                ))
+                print("Added index ix_attendance_date_student")
+
+            if 'ix_attendance_date_id' not in existing:
+                conn.execute(text("CREATE INDEX ix_attendance_date_id ON attendance (date, id)"))
+                print("Added index ix_attendance_date_id")
+
         return True
     except Exception as e:
-        print(f"Error creating database: {e}")
-        return False
\ No newline at end of file
+        print(f"Error migrating database: {e}")
+        return False
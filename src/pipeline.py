@@ -0,0 +1,288 @@
+import cv2
+import queue
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from .frame_source import open_source
+
+def put_latest(q, item):
+    """Put item into a bounded queue, dropping the oldest item when full"""
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class StageStats:
+    """Per-stage latency (ms) over a sliding window plus frame counters"""
+    def __init__(self, window=300):
+        # window=None menyimpan semua sampel (benchmark)
+        self.window = window
+        self.latencies = {}
+        self.counters = {}
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self.latencies:
+                self.latencies[stage] = deque(maxlen=self.window)
+            self.latencies[stage].append(seconds * 1000.0)
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def fps(self, counter='displayed'):
+        elapsed = time.perf_counter() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.counters.get(counter, 0) / elapsed
+
+    def summary(self):
+        """Get average and p50/p95/p99 latency per stage"""
+        with self._lock:
+            result = {}
+            for stage, values in self.latencies.items():
+                if not values:
+                    continue
+                ordered = sorted(values)
+                result[stage] = {
+                    'count': len(ordered),
+                    'avg_ms': sum(ordered) / len(ordered),
+                    'p50_ms': percentile(ordered, 0.50),
+                    'p95_ms': percentile(ordered, 0.95),
+                    'p99_ms': percentile(ordered, 0.99),
+                }
+            return result
+
+    def report(self):
+        lines = [f"FPS: display {self.fps('displayed'):.1f} | processed {self.fps('processed'):.1f} "
+                 f"| dropped frames {self.counters.get('dropped_frames', 0)}"]
+        if 'faces' in self.counters:
+            lines.append(f"  faces {self.counters['faces']} | model inferences {self.counters.get('inferences', 0)}")
+        for stage, values in self.summary().items():
+            lines.append(f"  {stage:<12} avg {values['avg_ms']:7.1f} ms | p50 {values['p50_ms']:7.1f} ms "
+                         f"| p95 {values['p95_ms']:7.1f} ms | p99 {values['p99_ms']:7.1f} ms")
+        return "\n".join(lines)
+
+class LatestFrameGrabber(threading.Thread):
+    """Capture thread that always keeps only the newest frame"""
+    def __init__(self, cap, stats):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.stats = stats
+        self.stopped = threading.Event()
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._captured_at = 0.0
+
+    def run(self):
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                self.stopped.set()
+                break
+            self.stats.record('capture', time.perf_counter() - start)
+
+            with self._condition:
+                if self._frame is not None:
+                    # Frame lama belum diambil worker -> dibuang
+                    self.stats.increment('dropped_frames')
+                self._frame = frame
+                self._frame_id += 1
+                self._captured_at = time.perf_counter()
+                self._condition.notify_all()
+
+        with self._condition:
+            self._condition.notify_all()
+
+    def get_latest(self, timeout=1.0):
+        """Take the newest frame, waiting for one if necessary"""
+        with self._condition:
+            if self._frame is None and not self.stopped.is_set():
+                self._condition.wait(timeout)
+            frame, captured_at = self._frame, self._captured_at
+            self._frame = None
+            return frame, captured_at
+
+    def stop(self):
+        self.stopped.set()
+
+class AttendancePipeline:
+    """Capture -> detect/recognize -> record pipeline connected by bounded queues"""
+    def __init__(self, attendance_system, source=0, report_interval=5.0, headless=False, stats=None):
+        self.attendance_system = attendance_system
+        self.source = source
+        self.report_interval = report_interval
+        self.headless = headless
+
+        self.stats = stats or StageStats()
+        self.stop_event = threading.Event()
+
+        self.display_queue = queue.Queue(maxsize=2)
+        # Event absensi tidak boleh dibuang (drop-oldest hanya untuk frame); ukurannya
+        # dibatasi _pending: paling banyak satu event per siswa dalam antrian
+        self.attendance_queue = queue.Queue()
+
+        # Status terakhir per siswa untuk overlay: name -> (status_text, color)
+        self.status = {}
+        self._pending = set()
+        self._status_lock = threading.Lock()
+
+    def _recognition_worker(self, grabber):
+        while not self.stop_event.is_set():
+            frame, captured_at = grabber.get_latest(timeout=0.5)
+            if frame is None:
+                if grabber.stopped.is_set():
+                    break
+                continue
+
+            start = time.perf_counter()
+            # Model baru (hot-reload) ditukar di antara dua frame, di thread recognition
+            self.attendance_system.swap_model()
+            face_system = self.attendance_system.face_system
+            faces = face_system.detect_faces(frame)
+            detected_at = time.perf_counter()
+            tracks = self.attendance_system.tracker.recognize(face_system, frame, faces)
+            recognized_at = time.perf_counter()
+            detections = [(track.box, track.name) for track in tracks]
+            decided = [track.name for track in tracks if track.decided]
+
+            self.stats.record('detect', detected_at - start)
+            self.stats.record('recognize', recognized_at - detected_at)
+            self.stats.increment('processed')
+            self.stats.increment('faces', len(tracks))
+            self.stats.increment('inferences', sum(1 for track in tracks if track.frames_since_recognition == 0))
+
+            for name in decided:
+                with self._status_lock:
+                    if name in self._pending:
+                        continue
+                    self._pending.add(name)
+                    self.status.setdefault(name, ("Checking...", (255, 255, 255)))
+                self.attendance_queue.put((name, time.perf_counter()))
+
+            dropped = put_latest(self.display_queue, (frame, detections, captured_at))
+            if dropped:
+                self.stats.increment('dropped_frames', dropped)
+
+        self.stop_event.set()
+
+    def _attendance_worker(self):
+        while not self.stop_event.is_set() or not self.attendance_queue.empty():
+            try:
+                name, queued_at = self.attendance_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            success, message = self.attendance_system.record_attendance(name)
+            finished = time.perf_counter()
+            self.stats.record('record', finished - start)
+            self.stats.record('record_wait', start - queued_at)
+
+            if success:
+                status = ("Recorded", (0, 255, 0))
+                print(f"{name} attendance recorded at {datetime.now().strftime('%H:%M:%S')}")
+            elif "today" in message:
+                status = ("Already Attended Today", (255, 165, 0))
+            elif "soon" in message:
+                status = ("Too Soon", (0, 255, 255))
+            else:
+                status = ("Error", (0, 0, 255))
+
+            with self._status_lock:
+                self.status[name] = status
+                self._pending.discard(name)
+
+    def _draw(self, frame, detections):
+        for (x, y, w, h), name in detections:
+            if name == "Unknown":
+                color, label = (0, 0, 255), "Unknown"
+            else:
+                with self._status_lock:
+                    status_text, color = self.status.get(name, ("Checking...", (255, 255, 255)))
+                label = f"{name} - {status_text}"
+            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+            cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+        cv2.putText(frame, f"Date: {date.today().strftime('%d-%m-%Y')}", (10, 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(frame, f"Time: {datetime.now().strftime('%H:%M:%S')}", (10, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(frame, f"FPS: {self.stats.fps('displayed'):.1f}", (10, 80),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    def run(self):
+        cap = grabber = None
+        workers = []
+        try:
+            # Sumber dibuka di dalam try: jika gagal, close() tetap menghentikan writer/watcher/metrics
+            cap = open_source(self.source)
+            grabber = LatestFrameGrabber(cap, self.stats)
+            workers = [
+                threading.Thread(target=self._recognition_worker, args=(grabber,), daemon=True),
+                threading.Thread(target=self._attendance_worker, daemon=True),
+            ]
+
+            if self.headless:
+                print("Starting pipelined attendance system (headless). Press Ctrl+C to stop.")
+            else:
+                print("Starting pipelined attendance system. Press 'q' to quit.")
+            grabber.start()
+            for worker in workers:
+                worker.start()
+
+            last_report = time.perf_counter()
+            while not self.stop_event.is_set():
+                try:
+                    frame, detections, captured_at = self.display_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                if not self.headless:
+                    self._draw(frame, detections)
+                    cv2.imshow('Attendance System', frame)
+                self.stats.increment('displayed')
+                self.stats.record('end_to_end', time.perf_counter() - captured_at)
+
+                if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                    print(self.stats.report())
+                    last_report = time.perf_counter()
+
+                if not self.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            if grabber is not None:
+                grabber.stop()
+            for worker in workers:
+                if worker.is_alive():
+                    worker.join(timeout=5)
+            if grabber is not None and grabber.is_alive():
+                grabber.join(timeout=2)
+            if cap is not None:
+                cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+            self.attendance_system.close()
+
+        print("=== Pipeline Statistics ===")
+        print(self.stats.report())
+        return self.stats
@@ -1,66 +1,253 @@
+import json
 import os
 import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 import cv2
 import numpy as np
+import sys
 from sklearn.preprocessing import LabelEncoder
 
-def preprocess_images(data_dir="data/students", img_size=(160, 160)):
-    
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import IMG_SIZE
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def _init_worker():
+    # Satu thread OpenCV per proses agar tidak berebut core
+    cv2.setNumThreads(1)
+
+def load_image(img_path, img_size, dtype='float32'):
+    """Decode, convert to RGB and resize one image; returns None if unreadable"""
+    img = cv2.imread(img_path)
+    if img is None:
+        return None
+
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = cv2.resize(img, img_size)
+    if np.dtype(dtype) == np.uint8:
+        return img
+    return img.astype(dtype) / 255.0
+
+def _decode_chunk(output_path, start, img_paths, img_size, dtype):
+    """Decode a chunk of images straight into the shared memmap; returns failed indices"""
+    X = np.load(output_path, mmap_mode='r+')
+    failed = []
+    for offset, img_path in enumerate(img_paths):
+        img = load_image(img_path, img_size, dtype)
+        if img is None:
+            failed.append(start + offset)
+            continue
+        X[start + offset] = img
+    X.flush()
+    del X
+    return failed
+
+def decode_images(img_paths, output_path, img_size=(160, 160), dtype='float32', workers=None, chunk_size=64):
+    """Decode images in parallel into a preallocated .npy memmap; returns indices that failed"""
+    X = np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype,
+                                  shape=(len(img_paths), img_size[1], img_size[0], 3))
+    del X
+
+    workers = workers or os.cpu_count() or 1
+    # Chunk lebih kecil untuk dataset kecil agar semua worker kebagian
+    chunk_size = max(1, min(chunk_size, -(-len(img_paths) // (workers * 4))))
+    chunks = [(start, img_paths[start:start + chunk_size]) for start in range(0, len(img_paths), chunk_size)]
+
+    failed = []
+    if workers == 1 or len(chunks) == 1:
+        for start, paths in chunks:
+            failed.extend(_decode_chunk(output_path, start, paths, img_size, dtype))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(_decode_chunk, output_path, start, paths, img_size, dtype)
+                       for start, paths in chunks]
+            for future in futures:
+                failed.extend(future.result())
+
+    return sorted(failed)
+
+def _file_signature(img_path):
+    stat = os.stat(img_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def _plan_student(student_name, img_paths, cache_dir, img_size, dtype):
+    """Split a student's images into cached rows and images that must be decoded"""
+    manifest = _load_manifest(os.path.join(cache_dir, f"{student_name}.json"))
+    shard_path = os.path.join(cache_dir, f"{student_name}.npy")
+
+    cached = {}
+    unreadable = {}
+    if (manifest and os.path.exists(shard_path)
+            and manifest['img_size'] == list(img_size) and manifest['dtype'] == np.dtype(dtype).name):
+        cached = {entry['file']: (row, entry['signature']) for row, entry in enumerate(manifest['files'])}
+        unreadable = {entry['file']: entry['signature'] for entry in manifest.get('unreadable', [])}
+
+    plan = []  # (img_path, signature, cached_row atau None)
+    skipped = []  # file yang sebelumnya gagal dibaca dan belum berubah
+    for img_path in img_paths:
+        signature = _file_signature(img_path)
+        img_file = os.path.basename(img_path)
+        entry = cached.get(img_file)
+        if entry is not None and entry[1] == signature:
+            plan.append((img_path, signature, entry[0]))
+        elif unreadable.get(img_file) == signature:
+            skipped.append((img_path, signature))
+        else:
+            plan.append((img_path, signature, None))
+
+    up_to_date = (bool(cached)
+                  and all(row is not None for _, _, row in plan)
+                  and len(plan) == len(manifest['files'])
+                  and len(skipped) == len(unreadable))
+    return plan, skipped, up_to_date
+
+def _write_shard(student_name, plan, skipped, cache_dir, new_path, new_index, failed, img_size, dtype):
+    """Build a student's shard from cached rows plus freshly decoded rows"""
+    shard_path = os.path.join(cache_dir, f"{student_name}.npy")
+    old = np.load(shard_path, mmap_mode='r') if os.path.exists(shard_path) else None
+    new = np.load(new_path, mmap_mode='r') if new_index else None
+
+    rows = [(img_path, signature, row) for img_path, signature, row in plan
+            if row is not None or new_index[img_path] not in failed]
+    unreadable = skipped + [(img_path, signature) for img_path, signature, row in plan
+                            if row is None and new_index[img_path] in failed]
+
+    tmp_path = shard_path + '.tmp.npy'
+    shard = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype,
+                                      shape=(len(rows), img_size[1], img_size[0], 3))
+    for i, (img_path, _, row) in enumerate(rows):
+        shard[i] = old[row] if row is not None else new[new_index[img_path]]
+    shard.flush()
+    del shard, old, new
+    os.replace(tmp_path, shard_path)
+
+    _write_manifest(os.path.join(cache_dir, f"{student_name}.json"), {
+        'img_size': list(img_size),
+        'dtype': np.dtype(dtype).name,
+        'files': [{'file': os.path.basename(img_path), 'signature': signature}
+                  for img_path, signature, _ in rows],
+        'unreadable': [{'file': os.path.basename(img_path), 'signature': signature}
+                       for img_path, signature in unreadable],
+    })
+    return len(rows)
+
+def _assemble_dataset(student_names, cache_dir, output_path, chunk_size=256):
+    """Concatenate student shards into one .npy memmap"""
+    shards = [np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r') for name in student_names]
+    total = sum(len(shard) for shard in shards)
+    sample_shape = next(shard.shape[1:] for shard in shards if len(shard))
+
+    tmp_path = output_path + '.tmp.npy'
+    X = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=shards[0].dtype, shape=(total,) + sample_shape)
+    offset = 0
+    for shard in shards:
+        for start in range(0, len(shard), chunk_size):
+            block = shard[start:start + chunk_size]
+            X[offset:offset + len(block)] = block
+            offset += len(block)
+    X.flush()
+    del X, shards
+    os.replace(tmp_path, output_path)
+
+def preprocess_images(data_dir="data/students", img_size=IMG_SIZE, dtype='uint8', workers=None,
+                      incremental=True, cache_dir="data/training_data/cache"):
+
     # Cek apakah folder data siswa ada
     if not os.path.exists(data_dir):
         print(f"Error: Folder {data_dir} tidak ditemukan!")
         print("Silakan jalankan opsi 1 untuk mengumpulkan data siswa terlebih dahulu.")
         return None, None, None
-    
+
     # Buat folder jika belum ada
     os.makedirs('data/models', exist_ok=True)
     os.makedirs('data/training_data', exist_ok=True)
-    
-    images = []
-    labels = []
-    student_names = []
+    if not incremental and os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
 
     # Cek apakah ada folder siswa
-    student_folders = [f for f in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, f))]
+    student_folders = sorted(f for f in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, f)))
     if not student_folders:
         print(f"Error: Tidak ada folder siswa di {data_dir}!")
         print("Silakan jalankan opsi 1 untuk mengumpulkan data siswa terlebih dahulu.")
         return None, None, None
 
+    started = time.perf_counter()
+
+    # Cache per gambar (nama file + mtime + ukuran): hanya foto baru/berubah yang di-decode
+    plans = {}
+    to_decode = []
     for student_name in student_folders:
         student_path = os.path.join(data_dir, student_name)
-        if not os.path.isdir(student_path):
-            continue
+        img_paths = [os.path.join(student_path, img_file) for img_file in sorted(os.listdir(student_path))
+                     if img_file.lower().endswith(IMAGE_EXTENSIONS)]
+        plans[student_name] = _plan_student(student_name, img_paths, cache_dir, img_size, dtype)
+        plan = plans[student_name][0]
+        to_decode.extend(img_path for img_path, _, row in plan if row is None)
+
+    new_path = os.path.join(cache_dir, '_new.npy')
+    new_index = {img_path: i for i, img_path in enumerate(to_decode)}
+    failed = set()
+    if to_decode:
+        print(f"Decoding {len(to_decode)} new or changed images...")
+        failed = set(decode_images(to_decode, new_path, img_size, dtype, workers))
+        for index in sorted(failed):
+            print(f"Warning: Tidak bisa membaca {to_decode[index]}")
 
-        student_names.append(student_name)
-        student_images = 0
-
-        for img_file in os.listdir(student_path):
-            if img_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                img_path = os.path.join(student_path, img_file)
-
-                img = cv2.imread(img_path)
-                if img is None:
-                    print(f"Warning: Tidak bisa membaca {img_path}")
-                    continue
-                    
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img = cv2.resize(img, img_size)
-                img = img.astype('float32') / 255.0
-
-                images.append(img)
-                labels.append(student_name)
-                student_images += 1
-        
-        print(f"Loaded {student_images} images for {student_name}")
-    
-    if len(images) == 0:
+    student_names = []
+    counts = {}
+    changed = False
+    for student_name in student_folders:
+        plan, skipped, up_to_date = plans[student_name]
+        if up_to_date:
+            count = len(plan)
+        else:
+            count = _write_shard(student_name, plan, skipped, cache_dir, new_path, new_index, failed,
+                                 img_size, dtype)
+            changed = True
+        print(f"Loaded {count} images for {student_name}" + (" (cached)" if up_to_date else ""))
+        if count:
+            student_names.append(student_name)
+            counts[student_name] = count
+
+    if os.path.exists(new_path):
+        os.remove(new_path)
+
+    # Shard siswa yang foldernya sudah dihapus
+    for cache_file in os.listdir(cache_dir):
+        name, ext = os.path.splitext(cache_file)
+        if ext in ('.npy', '.json') and not name.startswith('_') and name not in student_folders:
+            os.remove(os.path.join(cache_dir, cache_file))
+            changed = True
+
+    if not student_names:
         print("Error: Tidak ada gambar yang bisa diproses!")
         print("Pastikan folder siswa berisi file gambar (.jpg, .jpeg, .png)")
         return None, None, None
 
-    X = np.array(images)
-    y = np.array(labels)
+    # Susun dataset dari shard (hanya copy, tanpa decode ulang)
+    output_path = 'data/training_data/X_train.npy'
+    dataset_manifest_path = os.path.join(cache_dir, '_dataset.json')
+    dataset_manifest = {'students': counts, 'img_size': list(img_size), 'dtype': np.dtype(dtype).name}
+    if changed or not os.path.exists(output_path) or _load_manifest(dataset_manifest_path) != dataset_manifest:
+        _assemble_dataset(student_names, cache_dir, output_path)
+        _write_manifest(dataset_manifest_path, dataset_manifest)
+
+    y = np.array([name for name in student_names for _ in range(counts[name])])
 
     label_encoder = LabelEncoder()
     y_encoded = label_encoder.fit_transform(y)
@@ -68,10 +255,11 @@ def preprocess_images(data_dir="data/students", img_size=(160, 160)):
     with open('data/models/label_encoder.pkl', 'wb') as f:
         pickle.dump(label_encoder, f)
 
-    np.save('data/training_data/X_train.npy', X)
     np.save('data/training_data/y_train.npy', y_encoded)
 
-    print(f"Preprocessed {len(X)} images from {len(student_names)} students.")
+    X = np.load(output_path, mmap_mode='r')
+    elapsed = time.perf_counter() - started
+    print(f"Preprocessed {len(X)} images from {len(student_names)} students in {elapsed:.1f}s ({X.dtype}).")
     print(f"Student names: {list(label_encoder.classes_)}")
 
     return X, y_encoded, label_encoder
@@ -1,200 +1,443 @@
 import cv2
-import pandas as pd
 from datetime import date, datetime
 import os
+import sys
+import atexit
+import queue
+import threading
+import time
 from .face_detection_system import FaceRecognitionSystem
-from .models import get_db_session, Attendance, init_database
-from sqlalchemy import and_
+from .face_tracker import FaceTracker
+from .frame_source import open_source
+from .pipeline import AttendancePipeline, StageStats
+from .attendance_store import AttendanceStore
+from .metrics import metrics, MetricsRuntime
+from .models import session_scope, has_attendance_unique_constraint, Attendance
+from .attendance_summary import refresh_summaries
+from .model_registry import ModelWatcher
+from sqlalchemy import and_, insert
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model import MODEL_HOT_RELOAD
+
+class AttendanceWriter:
+    """Write-behind queue that flushes attendance rows with bulk inserts"""
+    def __init__(self, batch_size=50, flush_interval_ms=500, retry_delay=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.retry_delay = retry_delay
+
+        self.queue = queue.Queue()
+        self.pending = {}  # (student_name, date) -> row, menunggu di-flush
+        self.written = 0
+        self._flush_requests = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, student_name, record_date, time_str, status='Present'):
+        """Queue one attendance row; returns immediately"""
+        self.start()
+        self.queue.put({
+            'student_name': student_name,
+            'date': record_date,
+            'time': time_str,
+            'status': status,
+            'created_at': datetime.now(),
+        })
+
+    def _collect(self, timeout):
+        """Move queued rows into pending, coalescing duplicates"""
+        try:
+            row = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            if row is not None:
+                self.pending.setdefault((row['student_name'], row['date']), row)
+            try:
+                row = self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _flush(self):
+        if not self.pending:
+            return True
+
+        rows = list(self.pending.values())
+        # INSERT IGNORE + unique (student_name, date) -> retry tidak membuat duplikat
+        stmt = insert(Attendance).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite')
+
+        try:
+            with metrics.timer('db_flush'), session_scope() as db:
+                db.execute(stmt, rows)
+                # Ringkasan harian/bulanan diperbarui dalam transaksi yang sama
+                refresh_summaries(db, [(row['student_name'], row['date']) for row in rows])
+        except Exception as e:
+            print(f"Error flushing {len(rows)} attendance rows: {e}")
+            metrics.inc('db_errors_total', operation='flush')
+            return False
+
+        self.pending.clear()
+        self.written += len(rows)
+        metrics.inc('attendance_rows_written_total', len(rows))
+        return True
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            with self._lock:
+                waiters, self._flush_requests = self._flush_requests, []
+            timeout = 0.0 if waiters else max(0.0, next_flush - time.monotonic())
+            self._collect(timeout)
+
+            if len(self.pending) >= self.batch_size or time.monotonic() >= next_flush or waiters:
+                flushed = self._flush()
+                # Gagal -> baris tetap di pending dan dicoba lagi (at-least-once)
+                delay = self.flush_interval if flushed else self.retry_delay
+                next_flush = time.monotonic() + delay
+                for waiter in waiters:
+                    waiter.set()
+
+    def flush(self, timeout=10.0):
+        """Block until everything queued so far has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            self._collect(0)
+            return self._flush()
+
+        done = threading.Event()
+        with self._lock:
+            self._flush_requests.append(done)
+        self.queue.put(None)  # bangunkan writer
+        return done.wait(timeout) and not self.pending
+
+    def close(self):
+        """Stop the writer thread and flush remaining rows"""
+        if self._thread is not None and self._thread.is_alive():
+            self._stop.set()
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        self._collect(0)
+        if not self._flush():
+            print(f"Warning: {len(self.pending)} attendance rows could not be written!")
 
 class AttendanceSystem:
-    def __init__(self):
+    def __init__(self, write_behind=True, metrics_runtime=None, hot_reload=MODEL_HOT_RELOAD):
+        # Endpoint Prometheus / log JSON / profiler: None = sesuai config/metrics.py, False = mati
+        if metrics_runtime is None:
+            metrics_runtime = MetricsRuntime()
+        self.metrics_runtime = metrics_runtime or None
+
         self.face_system = FaceRecognitionSystem()
         
-        # Initialize database
-        if not init_database():
-            print("Warning: Database initialization failed!")
+        # Initialize database (query/export dipisah ke AttendanceStore)
+        self.store = AttendanceStore()
         
+        # Identitas per track, model hanya dijalankan ulang jika perlu
+        self.tracker = FaceTracker()
+
         self.last_recorded = {}
         self.min_interval = 30  # detik (untuk mencegah spam)
+        # Satu lock untuk cek-lalu-catat, agar dedup tetap benar saat dipanggil dari banyak kamera
+        self._record_lock = threading.Lock()
+
+        # Cache siswa yang sudah absen hari ini (hindari query DB per frame)
+        self.attended_today = set()
+        self.attended_date = None
+        self._cache_lock = threading.Lock()
+        self.load_attendance_cache()
+
+        # Write-behind: insert dikumpulkan dan di-flush dalam batch oleh thread terpisah.
+        # Retry flush hanya aman dengan unique (student_name, date); tabel lama tanpa constraint
+        # memakai jalur sinkron (cek-lalu-insert) sampai setup_database.py dijalankan
+        if write_behind and not has_attendance_unique_constraint():
+            print("Warning: attendance table has no unique (student_name, date) constraint, "
+                  "write-behind disabled. Run 'python setup_database.py' to migrate.")
+            write_behind = False
+        self.writer = AttendanceWriter() if write_behind else None
+
+        # Hot-reload: versi baru dari registry dimuat di background, ditukar di antara dua frame
+        self._staged_face_system = None
+        self._model_lock = threading.Lock()
+        self.model_watcher = ModelWatcher(self) if hot_reload else None
+        if self.model_watcher is not None:
+            self.model_watcher.start()
+
+    @property
+    def model_version(self):
+        """Registry version of the running model (or of the one waiting to be swapped in)"""
+        with self._model_lock:
+            staged = self._staged_face_system
+        return (staged or self.face_system).version
+
+    def stage_model(self, face_system):
+        """Hand over a loaded, warmed-up model; it becomes active at the next swap_model()"""
+        with self._model_lock:
+            self._staged_face_system = face_system
+
+    def swap_model(self):
+        """Activate a staged model between frames; returns True if the model changed"""
+        if self._staged_face_system is None:
+            return False
+        with self._model_lock:
+            face_system, self._staged_face_system = self._staged_face_system, None
+
+        previous = self.face_system.version
+        self.face_system = face_system
+        self.tracker.reset_scores()
+        metrics.inc('model_swaps_total')
+        print(f"Model switched: {previous or 'unversioned'} -> {face_system.version}")
+        return True
+
+    def close(self):
+        """Flush pending attendance writes"""
+        if self.model_watcher is not None:
+            self.model_watcher.stop()
+        if self.writer is not None:
+            self.writer.close()
+        if self.metrics_runtime is not None:
+            self.metrics_runtime.stop()
+
+    def load_attendance_cache(self, target_date=None):
+        """Preload names of students already recorded on target_date"""
+        target_date = target_date or date.today()
+        loaded = True
+
+        try:
+            with metrics.timer('db_cache_load'), session_scope() as db:
+                rows = db.query(Attendance.student_name).filter(Attendance.date == target_date).all()
+        except Exception as e:
+            # Tetap lanjut dengan cache kosong; pengecekan di DB saat insert masih berlaku
+            print(f"Error loading attendance cache: {e}")
+            metrics.inc('db_errors_total', operation='load_cache')
+            rows = []
+            loaded = False
+
+        with self._cache_lock:
+            self.attended_today = {row[0] for row in rows}
+            self.attended_date = target_date
+        return loaded
+
+    def has_attended(self, student_name, current_date):
+        """Check the in-memory cache, reloading it on date rollover"""
+        if self.attended_date != current_date:
+            self.load_attendance_cache(current_date)
+        with self._cache_lock:
+            return student_name in self.attended_today
+
+    def mark_attended(self, student_name, current_date):
+        with self._cache_lock:
+            if self.attended_date == current_date:
+                self.attended_today.add(student_name)
 
     def record_attendance(self, student_name):
+        with self._record_lock:
+            return self._record_attendance(student_name)
+
+    def _record_attendance(self, student_name):
         current_time = datetime.now()
         current_date = current_time.date()
         current_time_str = current_time.strftime('%H:%M:%S')
 
-        try:
-            # Get database session
-            db = get_db_session()
-            
-            # Cek apakah sudah absen hari ini
-            existing_attendance = db.query(Attendance).filter(
-                and_(
-                    Attendance.student_name == student_name,
-                    Attendance.date == current_date
-                )
-            ).first()
-            
-            if existing_attendance:
-                db.close()
-                return False, "Already attended today"
-            
-            # Cek interval waktu untuk mencegah spam
-            if student_name in self.last_recorded:
-                time_diff = (current_time - self.last_recorded[student_name]).total_seconds()
-                if time_diff < self.min_interval:
-                    db.close()
-                    return False, "Too soon to record again"
-                
+        # Sudah absen hari ini -> jawab dari cache tanpa round-trip DB
+        if self.has_attended(student_name, current_date):
+            metrics.inc('duplicates_suppressed_total', reason='already_attended')
+            return False, "Already attended today"
+
+        # Cek interval waktu untuk mencegah spam
+        if student_name in self.last_recorded:
+            time_diff = (current_time - self.last_recorded[student_name]).total_seconds()
+            if time_diff < self.min_interval:
+                metrics.inc('duplicates_suppressed_total', reason='too_soon')
+                return False, "Too soon to record again"
+
+        if self.writer is not None:
             self.last_recorded[student_name] = current_time
+            self.writer.submit(student_name, current_date, current_time_str)
+            self.mark_attended(student_name, current_date)
+            metrics.inc('attendance_recorded_total')
+            return True, "Attendance recorded successfully"
 
-            # Simpan ke database
-            new_attendance = Attendance(
-                student_name=student_name,
-                date=current_date,
-                time=current_time_str,
-                status='Present'
-            )
-            
-            db.add(new_attendance)
-            db.commit()
-            db.close()
-            
+        try:
+            with metrics.timer('db'), session_scope() as db:
+                # Cek apakah sudah absen hari ini (mis. dicatat oleh kamera lain)
+                existing_attendance = db.query(Attendance.id).filter(
+                    and_(
+                        Attendance.student_name == student_name,
+                        Attendance.date == current_date
+                    )
+                ).first()
+
+                if existing_attendance:
+                    self.mark_attended(student_name, current_date)
+                    metrics.inc('duplicates_suppressed_total', reason='already_attended')
+                    return False, "Already attended today"
+
+                self.last_recorded[student_name] = current_time
+
+                # Simpan ke database
+                db.add(Attendance(
+                    student_name=student_name,
+                    date=current_date,
+                    time=current_time_str,
+                    status='Present'
+                ))
+                db.flush()
+                refresh_summaries(db, [(student_name, current_date)])
+
+            self.mark_attended(student_name, current_date)
+            metrics.inc('attendance_recorded_total')
             return True, "Attendance recorded successfully"
             
         except Exception as e:
             print(f"Error saving attendance to database: {e}")
-            if 'db' in locals():
-                db.close()
+            metrics.inc('db_errors_total', operation='record')
             return False, "Failed to save attendance"
     
     def get_today_attendance(self):
         """Get today's attendance records"""
-        try:
-            db = get_db_session()
-            today = date.today()
-            
-            records = db.query(Attendance).filter(Attendance.date == today).all()
-            db.close()
-            
-            return records
-        except Exception as e:
-            print(f"Error getting attendance records: {e}")
-            return []
+        return self.store.get_today_attendance()
     
     def get_attendance_by_date(self, target_date):
         """Get attendance records by specific date"""
-        try:
-            db = get_db_session()
-            
-            records = db.query(Attendance).filter(Attendance.date == target_date).all()
-            db.close()
-            
-            return records
-        except Exception as e:
-            print(f"Error getting attendance records: {e}")
-            return []
+        return self.store.get_attendance_by_date(target_date)
     
     def export_to_excel(self, target_date=None):
         """Export attendance data to Excel file"""
+        return self.store.export_to_excel(target_date)
+
+    def export_attendance(self, start_date=None, end_date=None, student_name=None, fmt='xlsx'):
+        """Stream attendance data to xlsx/csv/parquet with date-range and student filters"""
+        return self.store.export_attendance(start_date, end_date, student_name, fmt)
+
+    def run_attendance_system(self, source=0, headless=False, stats=None):
+        """Run attendance on a camera, video file, image folder or synthetic source"""
+        stats = stats or StageStats()
+        cap = None
+
         try:
-            db = get_db_session()
-            
-            if target_date:
-                records = db.query(Attendance).filter(Attendance.date == target_date).all()
-                filename = f"data/attendance_logs/attendance_{target_date.strftime('%d_%m_%Y')}.xlsx"
+            # Sumber dibuka di dalam try: jika gagal, close() tetap menghentikan writer/watcher/metrics
+            cap = open_source(source)
+            if headless:
+                print("Starting attendance system (headless). Press Ctrl+C to stop.")
             else:
-                records = db.query(Attendance).all()
-                filename = f"data/attendance_logs/all_attendance_{datetime.now().strftime('%d_%m_%Y')}.xlsx"
-            
-            db.close()
-            
-            if not records:
-                print("No attendance records found!")
-                return False
-            
-            # Convert to DataFrame
-            data = []
-            for record in records:
-                data.append({
-                    'ID': record.id,
-                    'Student Name': record.student_name,
-                    'Date': record.date.strftime('%d-%m-%Y'),
-                    'Time': record.time,
-                    'Status': record.status,
-                    'Created At': record.created_at.strftime('%d-%m-%Y %H:%M:%S')
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Create folder if not exists
-            os.makedirs('data/attendance_logs', exist_ok=True)
-            
-            # Save to Excel
-            df.to_excel(filename, index=False)
-            print(f"Attendance data exported to {filename}")
-            return True
-            
-        except Exception as e:
-            print(f"Error exporting to Excel: {e}")
-            return False
-        
-    def run_attendance_system(self):
-        cap = cv2.VideoCapture(0)
+                print("Starting attendance system. Press 'q' to quit.")
 
-        print("Starting attendance system. Press 'q' to quit.")
+            while True:
+                frame_start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                captured_at = time.perf_counter()
+                stats.record('capture', captured_at - frame_start)
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+                # Model baru (jika sudah siap) aktif mulai frame ini
+                self.swap_model()
+                faces = self.face_system.detect_faces(frame)
+                detected_at = time.perf_counter()
+                tracks = self.tracker.recognize(self.face_system, frame, faces)
+                recognized_at = time.perf_counter()
+                stats.record('detect', detected_at - captured_at)
+                stats.record('recognize', recognized_at - detected_at)
+                stats.increment('faces', len(tracks))
 
-            faces = self.face_system.detect_faces(frame)
+                for track in tracks:
+                    (x, y, w, h), name = track.box, track.name
+                    # Absensi hanya dicatat setelah identitas track stabil (decided)
+                    if track.decided:
 
-            for (x, y, w, h) in faces:
-                face_roi = frame[y:y+h, x:x+w]
-                face_rgb = cv2.cvtColor(face_roi, cv2.COLOR_BGR2RGB)
+                        record_start = time.perf_counter()
+                        success, message = self.record_attendance(name)
+                        stats.record('record', time.perf_counter() - record_start)
 
-                name, confidence = self.face_system.predict_face(face_rgb)
+                        if success:
+                            color = (0, 255, 0)
+                            status_text = "Recorded"
+                            stats.increment('recorded')
+                        else:
+                            if "today" in message:
+                                color = (255, 165, 0)  # Orange untuk sudah absen hari ini
+                                status_text = "Already Attended Today"
+                            else:
+                                color = (0, 255, 255)  # Cyan untuk terlalu cepat
+                                status_text = "Too Soon"
 
-                if name != "Unknown":
+                        if not headless:
+                            cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                            cv2.putText(frame, f"{name} - {status_text}",
+                                        (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
-                    success, message = self.record_attendance(name)
+                        if success:
+                            print(f"{name} attendance recorded at {datetime.now().strftime('%H:%M:%S')}")
+                    elif not headless:
+                        color = (0, 0, 255) if name == "Unknown" else (255, 255, 255)
+                        label = "Unknown" if name == "Unknown" else f"{name} - Verifying"
+                        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+                        cv2.putText(frame, label,
+                                    (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
-                    if success:
-                        color = (0, 255, 0)
-                        status_text = "Recorded"
-                    else:
-                        if "today" in message:
-                            color = (255, 165, 0)  # Orange untuk sudah absen hari ini
-                            status_text = "Already Attended Today"
-                        else:
-                            color = (0, 255, 255)  # Cyan untuk terlalu cepat
-                            status_text = "Too Soon"
-
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
-                    cv2.putText(frame, f"{name} - {status_text}",
-                                (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
-                    
-                    if success:
-                        print(f"{name} attendance recorded at {datetime.now().strftime('%H:%M:%S')}")
-                else:
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-                    cv2.putText(frame, "Unknown",
-                                (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    
-            cv2.putText(frame, f"Date: {date.today().strftime('%d-%m-%Y')}", (10, 20), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(frame, f"Time: {datetime.now().strftime('%H:%M:%S')}", (10, 50), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            cv2.imshow('Attendance System', frame)
+                stats.increment('processed')
+                stats.record('frame', time.perf_counter() - captured_at)
+                if headless:
+                    continue
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+                cv2.putText(frame, f"Date: {date.today().strftime('%d-%m-%Y')}", (10, 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                cv2.putText(frame, f"Time: {datetime.now().strftime('%H:%M:%S')}", (10, 50),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
-        cap.release()
-        cv2.destroyAllWindows()
+                cv2.imshow('Attendance System', frame)
+                stats.increment('displayed')
+
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if cap is not None:
+                cap.release()
+            if not headless:
+                cv2.destroyAllWindows()
+            self.close()
+
+        stats.increment('inferences', self.tracker.faces_recognized)
+        print(f"Model inferences: {self.tracker.faces_recognized} of {self.tracker.faces_seen} detected faces")
+        return stats
+
+    def run_attendance_pipeline(self, source=0, headless=False, stats=None):
+        """Run attendance with capture, recognition and DB writes on separate threads"""
+        return AttendancePipeline(self, source=source, headless=headless, stats=stats).run()
+
+    def run_attendance_server(self, sources, max_batch=32, max_wait_ms=5.0):
+        """Run several cameras with one shared model, dedup state and DB writer"""
+        from .attendance_server import AttendanceServer
+        return AttendanceServer(sources, attendance_system=self, max_batch=max_batch, max_wait_ms=max_wait_ms).run()
 
 if __name__ == "__main__":
-    attendance_system = AttendanceSystem()
-    attendance_system.run_attendance_system()
+    import argparse
+    from config.metrics import METRICS_PORT, METRICS_LOG_INTERVAL, PROFILER
+    parser = argparse.ArgumentParser(description="Face recognition attendance")
+    parser.add_argument('--source', default='0', help="Camera index, video file, image folder or synthetic[:WxH]")
+    parser.add_argument('--headless', action='store_true', help="No GUI window")
+    parser.add_argument('--pipelined', action='store_true')
+    # Default dari config/metrics.py; argumen CLI hanya menimpa jika diberikan
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help="Serve Prometheus metrics on this port")
+    parser.add_argument('--metrics-log-interval', type=float, default=METRICS_LOG_INTERVAL,
+                        help="Print a JSON metrics line every N seconds")
+    parser.add_argument('--profile', choices=['cprofile', 'sampling'], default=PROFILER,
+                        help="Profile the run (toggle with SIGUSR1)")
+    args = parser.parse_args()
+
+    attendance_system = AttendanceSystem(metrics_runtime=MetricsRuntime(
+        port=args.metrics_port, log_interval=args.metrics_log_interval, profiler=args.profile))
+    if args.pipelined:
+        attendance_system.run_attendance_pipeline(args.source, headless=args.headless)
+    else:
+        attendance_system.run_attendance_system(args.source, headless=args.headless)